@@ -0,0 +1,261 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+
+import aiohttp
+
+from image_store import CHUNK_SIZE
+from rate_limit import RETRYABLE_STATUSES, FetchError, parse_retry_after
+from scrap import GRAPHQL_URL, HEADERS, REQUEST_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCrawlEngine:
+    """Crawl tag feeds with a bounded pool of asyncio workers sharing one keep-alive client.
+
+    Feed pages are still walked in order; the clap counts of a page are resolved in
+    one batched request and its articles are handed to `concurrency` workers, which
+    download the article images concurrently. The next page is fetched while the
+    workers are still busy with the previous ones, as far as the bounded queue
+    allows. Parsing, markdown conversion, request counting, rate limiting, the
+    retry queue and the on-disk layout are shared with the wrapped `MediumScraper`.
+    """
+
+    def __init__(self, scraper, concurrency=8):
+        self.scraper = scraper
+        self.concurrency = concurrency
+        self.session = None
+        # Posts currently being fetched, so a post seen twice in one run is fetched once
+        self.in_flight = set()
+        # Image downloads in progress by URL, so concurrent articles sharing an image wait for one fetch
+        self.image_downloads = {}
+
+    def scrap(self, tag_slugs):
+        """Scrape every tag slug in order, blocking until the crawl is done."""
+        asyncio.run(self._crawl(tag_slugs))
+
+    async def _crawl(self, tag_slugs):
+        connector = aiohttp.TCPConnector(limit=self.concurrency * 2, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        async with aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=timeout) as session:
+            self.session = session
+            for tag_slug in tag_slugs:
+                await self._crawl_tag(tag_slug)
+        self.session = None
+
+    async def _crawl_tag(self, tag_slug):
+        logger.info("Fetching articles for the tag slug '%s'.", tag_slug)
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        from_page = self.scraper._start_offset(tag_slug)
+        pages = self.scraper.page_checkpoints
+        workers = [asyncio.create_task(self._worker(queue, tag_slug, pages)) for _ in range(self.concurrency)]
+        while True:
+            try:
+                data = await self._with_retries(lambda: self._fetch_feed_page(from_page, tag_slug),
+                                                f"feed page {from_page}")
+            except FetchError as error:
+                self.scraper._dead_letter_feed_page(tag_slug, from_page, error)
+                break
+            if data is None:
+                break
+            items = self.scraper._feed_items(data, tag_slug)
+            if not items:
+                logger.info("No more posts found.")
+                pages.add_page(None, [])
+                break
+            posts, caught_up = self.scraper._new_posts([item['post'] for item in items])
+            clap_counts, failures = await self._resolve_clap_counts(posts)
+            jobs = self.scraper._article_jobs(posts, clap_counts, failures, tag_slug)
+            next_offset = None if caught_up else self.scraper._next_offset(data, tag_slug, from_page)
+            # Counted before the first job is queued, so a fast worker cannot finish the page early
+            pages.add_page(next_offset, jobs)
+            for job in jobs:
+                await queue.put(job)
+            for job in self.scraper.retry_queue.pop_due():
+                await queue.put(job)
+            if caught_up:
+                break
+            from_page = next_offset
+        await self._drain_retries(queue)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _drain_retries(self, queue):
+        """Hand failed articles back to the workers as their backoff elapses, until none are left."""
+        retry_queue = self.scraper.retry_queue
+        while True:
+            await queue.join()
+            delay = retry_queue.next_due_in()
+            if delay is None:
+                return
+            self.scraper.metrics.observe('sleep.retry_backoff.seconds', delay)
+            await asyncio.sleep(delay)
+            for job in retry_queue.pop_due():
+                await queue.put(job)
+
+    async def _worker(self, queue, tag_slug, pages):
+        while True:
+            job = await queue.get()
+            retrying = False
+            try:
+                await self._process_post(job['post'], job['clap_count'], tag_slug)
+            except FetchError as error:
+                retrying = self.scraper._schedule_retry(job, error)
+            except Exception:
+                # One broken article must not take the whole pool down
+                logger.exception("Failed to process post %s", job['post'].get('id'))
+            finally:
+                # A job queued for a retry keeps its page unfinished until it is saved or dead-lettered
+                if not retrying:
+                    pages.job_done(job)
+                queue.task_done()
+
+    @contextlib.asynccontextmanager
+    async def _request(self, method, url, kind, **kwargs):
+        """Send a request once its budget allows, counting it under `kind`.
+
+        Connection failures and 429/5xx responses slow the budget down and raise a retryable FetchError.
+        """
+        rate_limiter = self.scraper.rate_limiter
+        delay = rate_limiter.reserve(kind)
+        if delay > 0:
+            self.scraper.metrics.observe('sleep.rate_limit.seconds', delay)
+            await asyncio.sleep(delay)
+        started = time.perf_counter()
+        status = size = failure = None
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                status, size = response.status, response.content_length
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                rate_limiter.on_response(kind, response.status, retry_after)
+                if response.status in RETRYABLE_STATUSES:
+                    raise FetchError(f"{method} {url} returned HTTP {response.status}", retry_after=retry_after)
+                yield response
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            status, failure = None, repr(error)
+            rate_limiter.on_response(kind, 503)
+            raise FetchError(f"{method} {url} failed: {error!r}") from error
+        finally:
+            # Recorded once the body has been read, like the sync engine does
+            self.scraper._record_request(kind, method, url, status, time.perf_counter() - started, size, failure)
+
+    async def _with_retries(self, operation, description):
+        """Await `operation()` until it stops raising FetchError, backing off between attempts."""
+        attempt = 1
+        while True:
+            try:
+                return await operation()
+            except FetchError as error:
+                await asyncio.sleep(self.scraper._retry_delay(error, attempt, description))
+                attempt += 1
+
+    async def _post_graphql(self, payload, kind):
+        """POST GraphQL operations; returns the status and the decoded body (None unless a 200 JSON answer)."""
+        async with self._request('POST', GRAPHQL_URL, kind, json=payload) as response:
+            if response.status != 200:
+                logger.warning("GraphQL request failed: HTTP %s", response.status)
+                return response.status, None
+            body = await response.read()
+        data = self.scraper._decode_json_body(body)
+        if data is None:
+            # A challenge or error page; like the sync engine, it must not end the crawl
+            logger.warning("GraphQL response is not JSON: %r", body[:200])
+        return 200, data
+
+    async def _fetch_feed_page(self, from_page, tag_slug):
+        logger.info("Fetching posts starting from index %s...", from_page)
+        _, data = await self._post_graphql(self.scraper._feed_payload(from_page, tag_slug), 'graphql_feed')
+        if self.scraper._check_for_errors(data):
+            raise FetchError(f"Feed query failed: {data}")
+        return data
+
+    async def _fetch_clap_counts(self, post_ids):
+        if not post_ids:
+            return {}, {}
+        status, data = await self._post_graphql(self.scraper._clap_counts_payload(post_ids), 'graphql_claps')
+        if status != 200:
+            return {}, self.scraper._clap_counts_unavailable(post_ids, f"Clap count query failed: HTTP {status}")
+        return self.scraper._parse_clap_counts(post_ids, data)
+
+    async def _resolve_clap_counts(self, posts):
+        clap_counts, missing = self.scraper._feed_clap_counts(posts)
+        try:
+            resolved, failures = await self._with_retries(lambda: self._fetch_clap_counts(missing), "clap counts")
+            clap_counts.update(resolved)
+        except FetchError as error:
+            failures = self.scraper._clap_counts_unavailable(missing, error)
+        return clap_counts, failures
+
+    async def _fetch_article(self, url):
+        self.scraper.metrics.count('articles.fetched')
+        async with self._request('GET', url, 'article') as response:
+            if response.status != 200:
+                raise FetchError(f"Failed to retrieve the article {url}: HTTP {response.status}", retryable=False)
+            content = await response.read()
+            self.scraper._check_article_page(url, response.headers.get('Content-Type', ''), content)
+            return content
+
+    async def _process_post(self, post, clap_count, tag_slug):
+        full_url = self.scraper._post_url(post)
+        post_id = post['id']
+        if post_id in self.in_flight or post_id in self.scraper.crawl_index:
+            logger.debug("Article already downloaded: %s", full_url)
+            self.scraper.metrics.count('articles.skipped.known')
+            return
+        self.in_flight.add(post_id)
+        try:
+            with self.scraper.metrics.timer('article'):
+                await self._fetch_and_save(post, full_url, clap_count, tag_slug)
+        finally:
+            self.in_flight.discard(post_id)
+
+    async def _fetch_and_save(self, post, full_url, clap_count, tag_slug):
+        post_id = post['id']
+        logger.info("Fetching article %s", full_url)
+        content = await self._fetch_article(full_url)
+        self.scraper._cache_responses(post_id, post, clap_count, content)
+        clap_range = self.scraper._get_clap_range_for_clap_count(clap_count)
+        _, article_folder_path, file_path = self.scraper._article_location(full_url, tag_slug, clap_range)
+        # Parsing is CPU-bound; keep it off the event loop so downloads keep flowing
+        markdown_content, image_info_list = await asyncio.to_thread(self.scraper._convert_article, content)
+        if markdown_content is None:
+            return
+        os.makedirs(article_folder_path, exist_ok=True)
+        with self.scraper.metrics.timer('images'):
+            relative_paths = await asyncio.gather(
+                *(self._download_image(image_url, article_folder_path) for image_url, _ in image_info_list))
+        image_paths = [(placeholder, relative_path)
+                       for (_, placeholder), relative_path in zip(image_info_list, relative_paths) if relative_path]
+        markdown_content = self.scraper._replace_image_placeholders(markdown_content, image_paths)
+        self.scraper._save_article(post_id, tag_slug, clap_range, file_path, markdown_content, post, clap_count)
+
+    async def _download_image(self, image_url, article_folder):
+        object_path = self.scraper._stored_image(image_url)
+        if object_path is None:
+            download = self.image_downloads.get(image_url)
+            if download is None:
+                download = self.image_downloads[image_url] = asyncio.ensure_future(self._fetch_image(image_url))
+                download.add_done_callback(lambda _: self.image_downloads.pop(image_url, None))
+            object_path = await asyncio.shield(download)
+            if object_path is None:
+                return None
+        return self.scraper._link_image(object_path, article_folder)
+
+    async def _fetch_image(self, image_url):
+        image_store = self.scraper.image_store
+        logger.debug("Downloading image: %s", image_url)
+        headers = image_store.conditional_headers(image_url)
+        async with self._request('GET', image_url, 'image', headers=headers) as response:
+            if response.status != 200:
+                return self.scraper._image_not_downloaded(image_url, response.status)
+            content_type = response.headers.get('Content-Type')
+            if not self.scraper._is_image(content_type):
+                raise self.scraper._not_an_image(image_url, content_type, await response.read())
+            with image_store.writer() as writer:
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    writer.write(chunk)
+            return self.scraper._store_image(image_url, writer, response.headers)
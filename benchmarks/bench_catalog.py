@@ -0,0 +1,66 @@
+"""Catalog query latency over a synthetic crawl index.
+
+    python benchmarks/bench_catalog.py --articles 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawl_index import CrawlIndex  # noqa: E402
+
+TAGS = [f"tag-{i}" for i in range(200)]
+
+
+def populate(crawl_index, articles):
+    """Insert `articles` catalog rows with one to five tags each, in one transaction."""
+    rows, tag_rows = [], []
+    for index in range(articles):
+        post_id = f"{index:012x}"
+        tags = random.sample(TAGS, random.randint(1, 5))
+        rows.append((post_id, f"post-{post_id}", tags[0], '0', f"{tags[0]}/{post_id}.md", '', time.time(),
+                     f"Post {index}", f"author{index % 5000}", int(random.paretovariate(1.2) * 50),
+                     random.uniform(1, 20), 1.5e9 + random.uniform(0, 2.5e8), random.randint(300, 5000)))
+        tag_rows.extend((tag, post_id) for tag in tags)
+    crawl_index.connection.executemany(
+        'INSERT INTO articles (post_id, slug, tag, clap_range, path, content_hash, fetched_at, title, author, '
+        'clap_count, reading_time, published_at, word_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    crawl_index.connection.executemany('INSERT INTO article_tags (tag, post_id) VALUES (?, ?)', tag_rows)
+    crawl_index.connection.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Catalog query benchmark')
+    parser.add_argument('--articles', type=int, default=100000, help='Synthetic articles in the catalog')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per query; the median is reported')
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as articles_directory:
+        crawl_index = CrawlIndex(articles_directory)
+        populate(crawl_index, args.articles)
+        queries = {
+            'tag, min claps 1000, by claps': dict(tag='tag-7', min_claps=1000),
+            'tag, by claps, top 50': dict(tag='tag-7', limit=50),
+            'min claps 5000, by claps': dict(min_claps=5000),
+            'author, by published': dict(author='author42', sort='published'),
+            'all, by claps, top 100': dict(limit=100),
+        }
+        print(f"{len(crawl_index)} articles in the catalog")
+        for name, filters in queries.items():
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                results = crawl_index.search(**filters)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            print(f"{name:>32}: {len(results):>6} results in {timings[len(timings) // 2] * 1000:.2f} ms")
+        crawl_index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Micro-benchmark of the HTML-to-Markdown conversion over saved article pages.
+
+First checks that the current pipeline reproduces the golden Markdown of every
+fixture byte for byte, then measures articles/sec and peak RSS of the current
+and the legacy pipeline, each in a fresh process. With --response-cache it runs
+over the raw pages kept by a `--cache-raw` crawl instead of the fixtures:
+
+    python benchmarks/bench_convert.py --repeat 20
+    python benchmarks/bench_convert.py --response-cache medium-articles --repeat 1
+"""
+import argparse
+import glob
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from make_fixtures import FIXTURES_DIRECTORY, fake_download  # noqa: E402
+
+
+def current_convert(content, download_image):
+    from scrap import MediumScraper
+    markdown_content, image_info_list = MediumScraper._convert_article_html(content)
+    if markdown_content is None:
+        return None
+    image_paths = []
+    for image_url, placeholder in image_info_list:
+        relative_image_path = download_image(image_url)
+        if relative_image_path:
+            image_paths.append((placeholder, relative_image_path))
+    return MediumScraper._replace_image_placeholders(markdown_content, image_paths)
+
+
+def legacy_convert(content, download_image):
+    from legacy_convert import convert
+    return convert(content, download_image)
+
+
+CONVERTERS = {'current': current_convert, 'legacy': legacy_convert}
+
+
+def load_pages(directory, from_cache=False):
+    if from_cache:
+        from response_cache import ResponseCache
+        cache = ResponseCache(directory)
+        pages = [(post_id, cache.get(post_id, 'html')) for post_id in cache.post_ids('html')]
+        cache.close()
+        return pages
+    pages = []
+    for html_path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        with open(html_path, 'rb') as file:
+            pages.append((html_path, file.read()))
+    return pages
+
+
+def check_golden(pages):
+    """Return the fixtures whose converted Markdown differs from the golden file."""
+    mismatches = []
+    for html_path, content in pages:
+        golden_path = html_path[:-len('.html')] + '.md'
+        golden = None
+        if os.path.exists(golden_path):
+            with open(golden_path, encoding='utf-8', newline='') as file:
+                golden = file.read()
+        with redirect_stdout(io.StringIO()):
+            markdown_content = current_convert(content, fake_download)
+        if markdown_content != golden:
+            mismatches.append(os.path.basename(html_path))
+    return mismatches
+
+
+def measure(converter, directory, from_cache, repeat):
+    """Convert every page `repeat` times; runs in a fresh process so peak RSS is its own."""
+    pages = load_pages(directory, from_cache)
+    convert = CONVERTERS[converter]
+    with redirect_stdout(io.StringIO()):
+        # Warm up imports and caches outside the timed loop
+        convert(pages[0][1], fake_download)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for _, content in pages:
+                convert(content, fake_download)
+        elapsed = time.perf_counter() - started
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+    return {'articles_per_second': repeat * len(pages) / elapsed, 'peak_rss_mb': peak_rss_mb}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML-to-Markdown conversion benchmark')
+    parser.add_argument('--fixtures', default=FIXTURES_DIRECTORY, help='Directory of saved .html pages and golden .md files')
+    parser.add_argument('--response-cache', metavar='ARTICLES_DIRECTORY', help='Benchmark over the raw pages cached by a --cache-raw crawl')
+    parser.add_argument('--repeat', type=int, default=20, help='Passes over the fixtures per converter')
+    args = parser.parse_args()
+
+    from_cache = args.response_cache is not None
+    directory = args.response_cache if from_cache else args.fixtures
+    pages = load_pages(directory, from_cache)
+    if not pages:
+        print(f"No pages found in {directory}")
+        sys.exit(1)
+    if from_cache:
+        print(f"{len(pages)} cached pages")
+    else:
+        mismatches = check_golden(pages)
+        if mismatches:
+            print(f"Output differs from the golden Markdown for: {', '.join(mismatches)}")
+            sys.exit(1)
+        print(f"{len(pages)} fixtures match the golden Markdown byte for byte")
+
+    context = multiprocessing.get_context('spawn')
+    for converter in CONVERTERS:
+        with context.Pool(1) as pool:
+            result = pool.apply(measure, (converter, directory, from_cache, args.repeat))
+        print(f"{converter:>7}: {result['articles_per_second']:.1f} articles/s, peak RSS {result['peak_rss_mb']:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Throughput benchmark: sync engine vs async engine against the local stub server.
+
+    python benchmarks/bench_crawl.py --pages 2 --images 3 --latency 0.02 --concurrency 16
+
+With --error-rate, --missing-articles and --missing-clap-counts the stub injects
+429/503 responses, 404 article pages and failed clap count operations, to check
+that both engines retry, save every other article and dead-letter the rest:
+
+    python benchmarks/bench_crawl.py --pages 2 --error-rate 0.1 --missing-articles 2
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import PAGE_SIZE, StubMedium  # noqa: E402
+
+
+# The stub never throttles, so let the rate limiter get out of the way
+UNLIMITED = dict(graphql_rate=1000, article_rate=1000, image_rate=1000)
+# Injected errors carry Retry-After: 0, so retries need not wait the production backoff
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 0.5
+
+
+def make_scraper(scrap, feed_clap_counts):
+    scraper = scrap.MediumScraper(rates=UNLIMITED, feed_clap_counts=feed_clap_counts, tag_slugs=['benchmark'])
+    scraper.retry_queue.base_delay = RETRY_BASE_DELAY
+    scraper.retry_queue.max_delay = RETRY_MAX_DELAY
+    return scraper
+
+
+def run_sync(scrap, tag_slug, feed_clap_counts):
+    scraper = make_scraper(scrap, feed_clap_counts)
+    scraper._scrap_tag(tag_slug)
+    return scraper
+
+
+def run_async(scrap, tag_slug, concurrency, feed_clap_counts):
+    from async_engine import AsyncCrawlEngine
+    scraper = make_scraper(scrap, feed_clap_counts)
+    AsyncCrawlEngine(scraper, concurrency=concurrency).scrap([tag_slug])
+    return scraper
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl engine throughput benchmark')
+    parser.add_argument('--pages', type=int, default=2, help='Feed pages of 25 posts served by the stub')
+    parser.add_argument('--images', type=int, default=3, help='Images per article')
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds added to every stub response')
+    parser.add_argument('--concurrency', type=int, default=16, help='Async engine worker count')
+    parser.add_argument('--feed-clap-counts', action='store_true', help='Take clap counts from the feed response')
+    parser.add_argument('--engines', nargs='+', choices=['sync', 'async'], default=['sync', 'async'])
+    parser.add_argument('--stages', action='store_true', help='Also print the time spent per stage by each engine')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of stub responses turned into a 429 or 503 with Retry-After: 0')
+    parser.add_argument('--missing-articles', type=int, default=0, metavar='N',
+                        help='Number of article pages the stub answers with a 404')
+    parser.add_argument('--missing-clap-counts', type=int, default=0, metavar='N',
+                        help='Number of posts whose clap count operation the stub answers with a GraphQL error')
+    args = parser.parse_args()
+
+    articles = args.pages * PAGE_SIZE
+    faulty = random.Random(0).sample(range(articles), args.missing_articles + args.missing_clap_counts)
+    missing_slugs = [StubMedium.post_slug('benchmark', index) for index in faulty[:args.missing_articles]]
+    missing_clap_indexes = faulty[args.missing_articles:]
+    # Posts that cannot be saved and must be dead-lettered instead
+    expected_dead = set(missing_slugs) | {StubMedium.post_slug('benchmark', index) for index in missing_clap_indexes}
+    with StubMedium(pages=args.pages, images=args.images, latency=args.latency, error_rate=args.error_rate,
+                    missing_slugs=missing_slugs,
+                    missing_clap_posts=[StubMedium.post_id('benchmark', index) for index in missing_clap_indexes]) as stub:
+        os.environ['MEDIUM_URL'] = stub.url
+        import scrap
+
+        for engine in args.engines:
+            with tempfile.TemporaryDirectory() as articles_directory:
+                scrap.ARTICLES_DIRECTORY = articles_directory
+                requests_before, errors_before = stub.request_count, stub.error_count
+                started = time.perf_counter()
+                if engine == 'sync':
+                    scraper = run_sync(scrap, 'benchmark', args.feed_clap_counts)
+                else:
+                    scraper = run_async(scrap, 'benchmark', args.concurrency, args.feed_clap_counts)
+                elapsed = time.perf_counter() - started
+                saved = sum(name.endswith('.md') for _, _, files in os.walk(articles_directory) for name in files)
+            non_image = sum(count for kind, count in scraper.metrics.prefixed('requests.').items() if kind != 'image')
+            print(f"{engine:>5}: {saved}/{articles} articles in {elapsed:.2f}s "
+                  f"({saved / elapsed:.1f} articles/s, {stub.request_count - requests_before} requests, "
+                  f"{non_image / saved:.2f} non-image requests per article)")
+            if args.error_rate or expected_dead:
+                dead_slugs = sorted(job['url'].rsplit('/', 1)[-1] for job in scraper.retry_queue.dead_letters)
+                # An article fails when its page or any of its images does, so a few may run out of attempts
+                print(f"       {stub.error_count - errors_before} injected errors, "
+                      f"{scraper.metrics.counters['retries.inline']} inline and "
+                      f"{scraper.metrics.counters['retries.article']} article retries; "
+                      f"dead letters: {sum(slug in expected_dead for slug in dead_slugs)}/{len(expected_dead)} "
+                      f"unsavable posts, {sum(slug not in expected_dead for slug in dead_slugs)} out of attempts")
+            if args.stages:
+                for line in scraper.metrics.summary():
+                    print(f"       {line}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Bytes per feed page and JSON decode time, legacy feed queries against the current ones.
+
+Runs over the feed responses generated by make_feed_fixtures.py. First checks
+that the scraper reads the same posts (URL and catalog fields) out of the
+legacy and the current response of each feed, then reports the request and
+response sizes (raw and gzip, as sent over the wire) and the time to turn a
+page into JSON: the old path decoded the body three times (`is_json(response.text)`,
+then `response.json()` for the error check and again for the posts), the
+current one decodes the bytes once:
+
+    python benchmarks/bench_feed_query.py --repeat 50
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import legacy_feed_queries  # noqa: E402
+from make_feed_fixtures import FIXTURES_DIRECTORY  # noqa: E402
+from scrap import MediumScraper  # noqa: E402
+
+FEEDS = {
+    'tag': ('python', legacy_feed_queries.TAG_FEED_QUERY),
+    'recommended': ('recommended', legacy_feed_queries.RECOMMENDED_FEED_QUERY),
+}
+
+
+def make_response(body):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json; charset=utf-8'
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response._content = body
+    return response
+
+
+def legacy_decode(response):
+    """The feed page path before the single decode: `_fetch_feed_page` then `fetch_posts`."""
+    def is_json(response_text):
+        try:
+            json.loads(response_text)
+            return True
+        except json.JSONDecodeError:
+            return False
+
+    if response.status_code == 200 and is_json(response.text) and MediumScraper._check_for_errors(response.json()):
+        raise ValueError("error payload")
+    return response.json()
+
+
+def current_decode(response):
+    data = MediumScraper._decode_json(response)
+    if MediumScraper._check_for_errors(data):
+        raise ValueError("error payload")
+    return data
+
+
+def posts(data, tag_slug):
+    return [(MediumScraper._post_url(item['post']), MediumScraper._catalog_entry(item['post'], item['post']['clapCount']))
+            for item in MediumScraper._feed_items(data, tag_slug)]
+
+
+def median_seconds(function, argument, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Feed query size and decode benchmark')
+    parser.add_argument('--repeat', type=int, default=50, help='Decodes per page; the median is reported')
+    args = parser.parse_args()
+
+    for feed, (tag_slug, legacy_query) in FEEDS.items():
+        current_payload = MediumScraper._feed_payload(0, tag_slug)
+        legacy_payload = [{**current_payload[0], 'query': legacy_query}]
+        rows = {}
+        for version, payload in (('legacy', legacy_payload), ('current', current_payload)):
+            with open(os.path.join(FIXTURES_DIRECTORY, f"{feed}-{version}.json"), 'rb') as file:
+                body = file.read()
+            request_body = json.dumps(payload).encode()
+            decode = legacy_decode if version == 'legacy' else current_decode
+            response = make_response(body)
+            rows[version] = (len(request_body), len(body), len(gzip.compress(body)),
+                             median_seconds(decode, response, args.repeat), posts(decode(response), tag_slug))
+        assert rows['legacy'][4] == rows['current'][4], f"{feed}: the posts read from the two responses differ"
+        print(f"{feed} feed, {len(rows['current'][4])} posts per page, same posts read from both responses")
+        for version, (request_bytes, response_bytes, gzip_bytes, seconds, _) in rows.items():
+            print(f"  {version:>7}: request {request_bytes / 1024:6.1f} KiB, response {response_bytes / 1024:6.1f} KiB "
+                  f"({gzip_bytes / 1024:5.1f} KiB gzip), decode {seconds * 1000:7.3f} ms")
+        legacy, current = rows['legacy'], rows['current']
+        print(f"  {'saved':>7}: {(1 - (current[0] + current[2]) / (legacy[0] + legacy[2])) * 100:.0f}% of the bytes "
+              f"on the wire, {legacy[3] / current[3]:.1f}x faster decode")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""The article conversion pipeline as it was before the lxml/single-pass rewrite.
+
+Kept verbatim as the reference the golden Markdown fixtures were produced with,
+and as the baseline of bench_convert.py.
+"""
+from bs4 import BeautifulSoup
+from markdownify import markdownify as md
+
+
+def _extract_highest_resolution_image(srcset):
+    images = srcset.split(",")
+    return images[-1].strip().split(" ")[0]
+
+
+def _preprocess_html_for_images(soup):
+    figures = soup.find_all('figure')
+    image_info_list = []
+    for i, figure in enumerate(figures):
+        picture = figure.find('picture')
+        if picture:
+            source = picture.find('source')
+            if source and 'srcset' in source.attrs:
+                srcset = source['srcset']
+                highest_resolution_image = _extract_highest_resolution_image(srcset)
+                placeholder = f"{{{{IMAGE_PLACEHOLDER_{i}}}}}"
+                figure.replace_with(placeholder)
+                escaped_placeholder = placeholder.replace("_", "\\_")
+                image_info_list.append((highest_resolution_image, escaped_placeholder))
+    return image_info_list
+
+
+def convert(content, download_image):
+    """Convert a page to Markdown, calling `download_image(url)` for each image's relative path."""
+    soup = BeautifulSoup(content, 'html.parser')
+    article_section = soup.find('article')
+    if not article_section:
+        return None
+    image_info_list = _preprocess_html_for_images(article_section)
+    markdown_content = md(str(article_section), heading_style="ATX")
+    for image_url, placeholder in image_info_list:
+        relative_image_path = download_image(image_url)
+        if relative_image_path:
+            markdown_content = markdown_content.replace(placeholder, f"![]({relative_image_path})", 1)
+    return markdown_content
@@ -0,0 +1,174 @@
+"""Generate feed page responses for the legacy and the current feed queries.
+
+Each response is filled in to the exact shape of its query: fragments are
+inlined and merged the way a GraphQL server merges them, list fields get a
+typical Medium length (25 items per page, a preview of ten paragraphs), and
+every value is seeded by its path in the response, so the fields both queries
+select come out identical in both responses:
+
+    python benchmarks/make_feed_fixtures.py
+"""
+import json
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import legacy_feed_queries  # noqa: E402
+from scrap import RECOMMENDED_FEED_QUERY, TAG_FEED_QUERY  # noqa: E402
+
+FIXTURES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'feeds')
+QUERIES = {
+    'tag-legacy': legacy_feed_queries.TAG_FEED_QUERY,
+    'tag-current': TAG_FEED_QUERY,
+    'recommended-legacy': legacy_feed_queries.RECOMMENDED_FEED_QUERY,
+    'recommended-current': RECOMMENDED_FEED_QUERY,
+}
+LIST_LENGTHS = {'items': 25, 'paragraphs': 10, 'markups': 2, 'sections': 1, 'tags': 3}
+WORDS = ("latency throughput service mesh kubernetes queue cache shard replica idempotent "
+         "backpressure consumer producer gateway schema python rust data engineering").split()
+TOKEN = re.compile(r'\.\.\.|[{}()]|[_A-Za-z][_0-9A-Za-z]*')
+
+
+def tokens(query):
+    """Names, braces and spreads of a query, skipping arguments and variable definitions."""
+    depth = 0
+    for token in TOKEN.findall(query):
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0:
+            yield token
+
+
+def parse(query):
+    """Return the operation's selection set and the fragments by name."""
+    stream = list(tokens(query))
+    position = 0
+
+    def selection_set():
+        nonlocal position
+        assert stream[position] == '{'
+        position += 1
+        selections = []
+        while stream[position] != '}':
+            token = stream[position]
+            position += 1
+            if token == '...':
+                if stream[position] == 'on':
+                    position += 2
+                    selections.append(('inline', selection_set()))
+                else:
+                    selections.append(('spread', stream[position]))
+                    position += 1
+            else:
+                selections.append(('field', token, selection_set() if stream[position] == '{' else None))
+        position += 1
+        return selections
+
+    operation, fragments = None, {}
+    while position < len(stream):
+        if stream[position] == 'fragment':
+            name = stream[position + 1]
+            position += 4  # fragment <name> on <type>
+            fragments[name] = selection_set()
+        else:
+            position += 2  # query <name>
+            operation = selection_set()
+    return operation, fragments
+
+
+def collect(selections, fragments, fields=None):
+    """Merge a selection set with its fragments into {field: [sub-selection sets]}."""
+    fields = {} if fields is None else fields
+    for selection in selections:
+        if selection[0] == 'field':
+            subselections = fields.setdefault(selection[1], [])
+            if selection[2] is not None:
+                subselections.append(selection[2])
+        elif selection[0] == 'inline':
+            collect(selection[1], fragments, fields)
+        else:
+            collect(fragments[selection[1]], fragments, fields)
+    return fields
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def scalar(name, parent, rng):
+    """A plausible value for field `name` of an object of type `parent`, by naming convention."""
+    if name == '__typename':
+        return parent
+    if name == 'id' and parent == 'Tag':
+        # Tag ids are their slugs
+        return rng.choice(WORDS)
+    if name == 'id' or name.endswith('Id'):
+        return f"{rng.getrandbits(48):012x}"
+    if name == 'text':
+        return sentence(rng, 40)
+    if name in ('title', 'subtitle', 'name', 'displayTitle', 'reasonString', 'bio', 'alt'):
+        return sentence(rng, 6)
+    if name == 'uniqueSlug':
+        return "-".join(rng.choice(WORDS) for _ in range(6)) + f"-{rng.getrandbits(48):012x}"
+    if name in ('mediumUrl', 'href', 'iframeSrc'):
+        return f"https://medium.com/@{rng.choice(WORDS)}/{rng.getrandbits(48):012x}"
+    if name.endswith('At'):
+        return rng.randint(1_500_000_000_000, 1_750_000_000_000) if rng.random() < 0.8 else None
+    if name in ('readingTime', 'focusPercentX', 'focusPercentY'):
+        return round(rng.uniform(1, 20), 6)
+    if name.startswith(('is', 'has', 'allow')):
+        return rng.random() < 0.5
+    if name in ('from', 'to'):
+        return str(rng.randrange(25, 1000, 25))
+    if name == 'limit':
+        return 25
+    if name in ('clapCount', 'count', 'followerCount', 'start', 'end', 'startIndex', 'originalHeight',
+                'originalWidth', 'iframeHeight', 'iframeWidth', 'httpStatus'):
+        return rng.randint(0, 5000)
+    return rng.choice(WORDS)
+
+
+def fill(fields, fragments, path, parent):
+    """Build the response object for merged `fields`, seeding each value by its path."""
+    result = {}
+    for name, subselections in fields.items():
+        field_path = f"{path}.{name}"
+        if not subselections:
+            result[name] = scalar(name, parent, random.Random(field_path))
+            continue
+        merged = {}
+        for selections in subselections:
+            collect(selections, fragments, merged)
+        # Type names from field names are close enough for fixtures: `tags` holds Tag objects
+        type_name = name[:1].upper() + name[1:]
+        if name in LIST_LENGTHS:
+            result[name] = [fill(merged, fragments, f"{field_path}.{index}", type_name.rstrip('s'))
+                            for index in range(LIST_LENGTHS[name])]
+        else:
+            result[name] = fill(merged, fragments, field_path, type_name)
+    return result
+
+
+def response(query):
+    operation, fragments = parse(query)
+    return [{'data': fill(collect(operation, fragments), fragments, 'data', 'Query')}]
+
+
+def main():
+    os.makedirs(FIXTURES_DIRECTORY, exist_ok=True)
+    for name, query in QUERIES.items():
+        # Compact, like the GraphQL endpoint answers
+        body = json.dumps(response(query), separators=(',', ':'))
+        with open(os.path.join(FIXTURES_DIRECTORY, f"{name}.json"), 'w', encoding='utf-8') as file:
+            file.write(body)
+        print(f"{name}: {len(query)} bytes of query, {len(body)} bytes of response")
+
+
+if __name__ == '__main__':
+    main()
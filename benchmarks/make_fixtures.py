@@ -0,0 +1,162 @@
+"""Generate the saved-HTML article fixtures and their golden Markdown.
+
+The pages mimic the structure of Medium article pages: a large <head> of styles
+and scripts, navigation, the <article> body with responsive <picture> figures,
+and a big serialized client state after it. Golden Markdown is produced with
+the reference pipeline in legacy_convert.py:
+
+    python benchmarks/make_fixtures.py
+"""
+import hashlib
+import json
+import os
+import random
+
+from legacy_convert import convert
+
+FIXTURES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'articles')
+CDN = 'https://miro.medium.com/v2/resize:fit'
+WORDS = ("latency throughput service_mesh kubernetes queue cache shard replica idempotent "
+         "backpressure consumer producer gateway schema snake_case retry timeout").split()
+
+
+def fake_download(image_url):
+    """Stand-in for the image download: images whose URL says 'missing' fail."""
+    if 'missing' in image_url:
+        return None
+    return f"images/{hashlib.md5(image_url.encode()).hexdigest()}.png"
+
+
+def sentence(rng, words=14):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def figure(rng, index, kind='picture'):
+    image_id = f"1*{rng.getrandbits(64):016x}" + ("-missing" if kind == 'missing' else "")
+    caption = f'<figcaption class="mj mk">Figure {index}: {sentence(rng, 5)}</figcaption>'
+    if kind == 'iframe':
+        return f'<figure class="mb"><div><iframe src="https://cdn.embedly.com/{index}" width="680"></iframe></div>{caption}</figure>'
+    if kind == 'no-srcset':
+        return f'<figure><div><picture><img alt="" src="{CDN}:700/{image_id}.png"/></picture></div>{caption}</figure>'
+    srcset = ", ".join(f"{CDN}:{width}/format:webp/{image_id}.png {width}w" for width in (640, 720, 750, 786, 828, 1100, 1400))
+    return (f'<figure class="mb mc md"><div class="me mf"><picture>'
+            f'<source srcSet="{srcset}" sizes="(min-resolution: 4dppx) and (max-width: 700px) 50vw, 700px" type="image/webp"/>'
+            f'<source data-testid="og" srcSet="{srcset.replace("format:webp/", "")}"/>'
+            f'<img alt="" class="bh ls mg c" width="700" height="394" loading="lazy" role="presentation"/>'
+            f'</picture></div>{caption}</figure>')
+
+
+def paragraph(rng, index):
+    text = sentence(rng)
+    return (f'<p id="p{index}" class="pw-post-body-paragraph ks kt fr ku b kv kw">{text} '
+            f'<strong class="ku fs">{rng.choice(WORDS)}</strong> and <em class="ny">{rng.choice(WORDS)}</em> '
+            f'with <a class="af oa" href="https://example.com/{index}?a=1&amp;b=2" rel="noopener">a link</a> '
+            f'and <code class="cw ob oc od oe b">{rng.choice(WORDS)}()</code>.</p>')
+
+
+def head(rng):
+    styles = "".join(f".c{i}{{margin:{i}px;padding:{i % 7}px}}" for i in range(1500))
+    scripts = "".join(f'<script src="https://cdn-client.medium.com/lite/static/js/{rng.getrandbits(32):08x}.js" async></script>'
+                      for _ in range(40))
+    return f'<head><meta charset="utf-8"/><title>Article</title><style>{styles}</style>{scripts}</head>'
+
+
+def client_state(rng):
+    state = {f"Post:{rng.getrandbits(48):012x}": {"id": i, "title": sentence(rng, 8), "clapCount": i * 13}
+             for i in range(400)}
+    return f'<script>window.__APOLLO_STATE__ = {json.dumps(state)}</script>'
+
+
+def page(rng, body):
+    return (f'<!doctype html><html lang="en">{head(rng)}<body><div id="root"><nav class="top">'
+            f'<a href="/">Medium</a><a href="/m/signin">Sign in</a></nav>{body}'
+            f'<footer><p>About</p><p>Help</p></footer></div>{client_state(rng)}</body></html>')
+
+
+def article(rng, title, blocks):
+    return (f'<article><div class="l"><div class="ab ca"><section><div class="gn go gp">'
+            f'<h1 id="title" class="pw-post-title hw hx">{title}</h1>'
+            f'<div class="speechify-ignore"><a href="/@author">Author Name</a> · 8 min read</div>'
+            f'{"".join(blocks)}</div></section></div></div></article>')
+
+
+def image_heavy(rng):
+    blocks = []
+    for i in range(40):
+        blocks.append(paragraph(rng, i))
+        blocks.append(figure(rng, i, 'missing' if i == 17 else 'picture'))
+    return page(rng, article(rng, "Forty figures of throughput", blocks))
+
+
+def code_heavy(rng):
+    blocks = [paragraph(rng, 0)]
+    for i in range(12):
+        blocks.append(f'<h2 id="h{i}" class="ph pi fr">Step {i}: use_{rng.choice(WORDS)}</h2>')
+        blocks.append(paragraph(rng, i + 1))
+        blocks.append(f'<pre class="pf pg"><span id="s{i}" class="pk lv fr pe b" data-selectable-paragraph="">'
+                      f'def handler_{i}(event, *args):\n    if event["x"] &lt; 3 &amp;&amp; ok:\n'
+                      f'        return {{"status": 200, "body": my_var_{i}}}\n    return None</span></pre>')
+    return page(rng, article(rng, "Code <em>heavy</em> &amp; escaped", blocks))
+
+
+def structured(rng):
+    items = "".join(f'<li id="li{i}" class="pl pm">{sentence(rng, 6)}<ul><li>nested {i}</li><li>{rng.choice(WORDS)}</li></ul></li>'
+                    for i in range(6))
+    blocks = [paragraph(rng, 0), f'<ol class="">{items}</ol>',
+              f'<blockquote class="pn po"><p id="q" class="pq">{sentence(rng)}</p></blockquote>',
+              '<h3 id="h3" class="qa">A third-level heading</h3>', paragraph(rng, 1),
+              '<h4 id="h4">Fourth level</h4>', f'<ul>{items}</ul>', '<hr/>', paragraph(rng, 2),
+              figure(rng, 0, 'iframe'), figure(rng, 1, 'no-srcset'), figure(rng, 2)]
+    return page(rng, article(rng, "Lists, quotes and headings", blocks))
+
+
+def unicode_text(rng):
+    blocks = [f'<p id="u{i}" class="pw-post-body-paragraph">Ünïcödé — “quoted” text&nbsp;with&nbsp;nbsp, émoji 🚀 and '
+              f'<mark>highlight</mark> #{i} *stars* _under_ [brackets]</p>' for i in range(20)]
+    blocks.insert(5, figure(rng, 0))
+    return page(rng, article(rng, "Ünïcödé & émoji 🚀", blocks))
+
+
+def irregular(rng):
+    """Valid but irregular markup: upper-case tags, void tags, unquoted attributes and entities."""
+    blocks = ['<p id=m1 class=x>Paragraph <b>bold <i>and italic</i></b> text</p>', '<p id="m2">Line<br>break<BR/>upper</p>',
+              '<DIV CLASS="X"><P>Upper-case tags</P></DIV>', '<p>Empty <span></span>span and <img src="x.png" alt="inline"> image</p>',
+              figure(rng, 0), '<p>Entity &copy; &#169; &amp;amp; &lt;tag&gt; &#x1F680; end</p>', figure(rng, 1),
+              '<p>Trailing<!-- a comment --> comment</p>']
+    return page(rng, article(rng, "Irregular markup", blocks))
+
+
+def no_article(rng):
+    return page(rng, '<main><h1>Member-only story</h1><p>Sign in to read</p></main>')
+
+
+FIXTURES = {
+    '01-image-heavy': image_heavy,
+    '02-code-heavy': code_heavy,
+    '03-structured': structured,
+    '04-unicode': unicode_text,
+    '05-irregular': irregular,
+    '06-no-article': no_article,
+}
+
+
+def main():
+    os.makedirs(FIXTURES_DIRECTORY, exist_ok=True)
+    for name, build in FIXTURES.items():
+        html = build(random.Random(name))
+        with open(os.path.join(FIXTURES_DIRECTORY, f"{name}.html"), 'w', encoding='utf-8') as file:
+            file.write(html)
+        markdown_content = convert(html.encode('utf-8'), fake_download)
+        golden_path = os.path.join(FIXTURES_DIRECTORY, f"{name}.md")
+        if markdown_content is None:
+            if os.path.exists(golden_path):
+                os.remove(golden_path)
+            print(f"{name}: no article section")
+            continue
+        with open(golden_path, 'w', encoding='utf-8') as file:
+            file.write(markdown_content)
+        print(f"{name}: {len(html)} bytes of HTML, {len(markdown_content)} bytes of Markdown")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Local stand-in for medium.com used by the benchmarks.
+
+Serves canned GraphQL responses for the operations the scraper sends, article
+pages with a configurable number of images, and the image bytes themselves. Each
+response is delayed by `latency` seconds to stand in for network round trips.
+
+For fault-injection runs, `error_rate` turns that fraction of the successful
+responses into a 429 or 503 with `Retry-After: 0`, the article pages whose
+slug is in `missing_slugs` answer 404, and the clap count operations of the
+posts in `missing_clap_posts` answer a GraphQL error, like a deleted post.
+"""
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE_SIZE = 25
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # A client closing an idle keep-alive connection is not worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def article_html(slug, base_url, images=3, paragraphs=12):
+    """Return a Medium-like article page with `images` figures; the first one is shared by every article."""
+    body = []
+    for i in range(paragraphs):
+        body.append(f'<p class="pw-post-body-paragraph">Paragraph {i} of <strong>{slug}</strong> with '
+                    f'<a href="https://example.com/{i}">a link</a> and <code>inline_code()</code>.</p>')
+        if i < images:
+            name = "shared-banner" if i == 0 else f"{slug}-{i}"
+            srcset = ", ".join(f"{base_url}/img/{name}-{width}.png {width}w" for width in (640, 1100, 1400))
+            body.append(f'<figure><div><picture><source srcset="{srcset}" type="image/webp"/>'
+                        f'<img alt="" src="{base_url}/img/{slug}-{i}-640.png"/></picture></div>'
+                        f'<figcaption>Figure {i}</figcaption></figure>')
+    return (f'<!doctype html><html><head><title>{slug}</title></head><body>'
+            f'<nav><a href="/">Medium</a></nav><article><div><h1>Title of {slug}</h1>{"".join(body)}'
+            f'<pre><code>def hello():\n    return "world"</code></pre></div></article>'
+            f'<footer>footer</footer></body></html>')
+
+
+class StubMedium:
+    """Threaded HTTP server that answers like Medium for `pages` feed pages per tag."""
+
+    def __init__(self, pages=2, images=3, latency=0.02, image_size=64 * 1024, error_rate=0.0, missing_slugs=(),
+                 missing_clap_posts=(), seed=0):
+        self.pages = pages
+        self.images = images
+        self.latency = latency
+        self.image_bytes = b"\x89PNG\r\n\x1a\n" + b"\0" * image_size
+        self.error_rate = error_rate
+        self.missing_slugs = set(missing_slugs)
+        self.missing_clap_posts = set(missing_clap_posts)
+        self.request_count = 0
+        self.error_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._make_handler())
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self):
+        with self._lock:
+            self.request_count += 1
+
+    def _injected_status(self):
+        """Return 429 or 503 for `error_rate` of the calls, to replace a successful response; else None."""
+        with self._lock:
+            if not self.error_rate or self._random.random() >= self.error_rate:
+                return None
+            self.error_count += 1
+            return self._random.choice([429, 503])
+
+    @staticmethod
+    def post_id(tag, index):
+        """The id of the `index`-th post of a tag's feed."""
+        return f"{zlib.crc32(tag.encode()):08x}{index:04x}"
+
+    @staticmethod
+    def post_slug(tag, index):
+        """The unique slug of the `index`-th post of a tag's feed."""
+        return f"{tag}-post-{index}-{StubMedium.post_id(tag, index)}"
+
+    def graphql(self, operations):
+        results = []
+        for operation in operations:
+            name = operation["operationName"]
+            variables = operation.get("variables", {})
+            if name == "HomeMainContentHeaderQuery":
+                data = {"viewer": {"followedTags": {"tags": [{"id": "benchmark", "displayTitle": "Benchmark"}]}}}
+            elif name == "ClapCountQuery":
+                post_id = variables["postId"]
+                if post_id in self.missing_clap_posts:
+                    results.append({"errors": [{"message": "Post not found", "path": ["postResult"]}],
+                                    "data": {"postResult": None}})
+                    continue
+                data = {"postResult": {"__typename": "Post", "id": post_id, "clapCount": int(post_id[-4:], 16)}}
+            elif name in ("WebInlineTopicFeedQuery", "WebInlineRecommendedFeedQuery"):
+                data = self.feed(name, variables)
+            else:
+                data = None
+            results.append({"data": data})
+        return results
+
+    def feed(self, name, variables):
+        start = int(variables["paging"]["from"] or 0)
+        tag = variables.get("tagSlug", "recommended")
+        items = []
+        if start < self.pages * PAGE_SIZE:
+            for index in range(start, start + PAGE_SIZE):
+                post_id = self.post_id(tag, index)
+                items.append({"post": {"id": post_id, "title": f"Post {index}", "clapCount": index * 40,
+                                       "creator": {"username": f"author{index % 7}"},
+                                       "uniqueSlug": self.post_slug(tag, index),
+                                       "readingTime": 3 + index % 11, "firstPublishedAt": 1700000000000 + index * 86400000,
+                                       "tags": [{"id": tag}, {"id": f"topic-{index % 3}"}]}})
+        key = "personalisedTagFeed" if name == "WebInlineTopicFeedQuery" else "webRecommendedFeed"
+        next_page = {"from": str(start + PAGE_SIZE), "limit": PAGE_SIZE, "to": str(start + PAGE_SIZE)}
+        return {key: {"items": items, "pagingInfo": {"next": next_page if items else None}}}
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, content_type, body, headers=None):
+                time.sleep(stub.latency)
+                stub._count()
+                injected_status = stub._injected_status() if status == 200 else None
+                if injected_status is not None:
+                    status, content_type, body, headers = injected_status, "text/plain", b"slow down", {"Retry-After": "0"}
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                operations = json.loads(self.rfile.read(length))
+                body = json.dumps(stub.graphql(operations)).encode()
+                self._send(200, "application/json", body)
+
+            def do_GET(self):
+                if self.path.startswith("/img/"):
+                    etag = f'"{zlib.crc32(self.path.encode()):08x}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self._send(304, "image/png", b"", {"ETag": etag})
+                    else:
+                        # Make every image's bytes distinct except for repeated URLs
+                        body = stub.image_bytes + self.path.encode()
+                        self._send(200, "image/png", body, {"ETag": etag})
+                elif self.path.startswith("/@"):
+                    slug = self.path.rsplit("/", 1)[-1]
+                    if slug in stub.missing_slugs:
+                        self._send(404, "text/plain", b"gone")
+                        return
+                    self._send(200, "text/html; charset=utf-8", article_html(slug, stub.url, stub.images).encode())
+                else:
+                    self._send(404, "text/plain", b"not found")
+
+        return Handler
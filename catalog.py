@@ -0,0 +1,60 @@
+import argparse
+import json
+import logging
+import time
+
+import scrap
+from crawl_index import CrawlIndex
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ('table', 'list', 'jsonl')
+
+
+def parse_date(value):
+    """Parse a `YYYY-MM-DD` command line date into a Unix timestamp (local midnight); an argparse type."""
+    try:
+        return time.mktime(time.strptime(value, '%Y-%m-%d'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a YYYY-MM-DD date, got {value!r}") from None
+
+
+def _format_row(article):
+    published = time.strftime('%Y-%m-%d', time.localtime(article['published_at'])) if article['published_at'] else '-'
+    reading_time = f"{article['reading_time']:.0f}m" if article['reading_time'] is not None else '-'
+    claps = article['clap_count'] if article['clap_count'] is not None else '-'
+    words = article['word_count'] if article['word_count'] is not None else '-'
+    return f"{claps:>7} {published:>10} {reading_time:>5} {words:>6}  {article['author'] or '-':<20} {article['title']}"
+
+
+class CatalogQuery:
+    """Search the catalog of downloaded articles in the crawl index and print the matches.
+
+    The `list` format prints `title: path` lines, the format of the old
+    hand-built `articles_with_min_claps.txt`.
+    """
+
+    def __init__(self, tag=None, author=None, min_claps=None, published_after=None, sort='claps', limit=None,
+                 output_format='table'):
+        self.filters = dict(tag=tag, author=author, min_claps=min_claps, published_after=published_after,
+                            sort=sort, limit=limit)
+        self.output_format = output_format
+
+    def run(self):
+        crawl_index = CrawlIndex(scrap.ARTICLES_DIRECTORY)
+        started = time.perf_counter()
+        articles = crawl_index.search(**self.filters)
+        logger.info("Found %d of %d articles in %.1f ms", len(articles), len(crawl_index),
+                    (time.perf_counter() - started) * 1000)
+        crawl_index.close()
+        if self.output_format == 'table':
+            print(f"{'claps':>7} {'published':>10} {'read':>5} {'words':>6}  {'author':<20} title")
+            for article in articles:
+                print(_format_row(article))
+        elif self.output_format == 'list':
+            for article in articles:
+                print(f"{article['title']}: {article['path']}")
+        else:
+            for article in articles:
+                print(json.dumps({**article, 'tags': (article['tags'] or '').split(',')}))
+        return articles
@@ -0,0 +1,345 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+
+INDEX_FILE_NAME = '.crawl-index.sqlite'
+# Catalog columns added to the articles table after it was first released, with their SQL types
+CATALOG_COLUMNS = {
+    'title': 'TEXT',
+    'author': 'TEXT',
+    'clap_count': 'INTEGER',
+    'reading_time': 'REAL',
+    'published_at': 'REAL',
+    'word_count': 'INTEGER',
+}
+# Sort orders of `CrawlIndex.search`
+CATALOG_SORTS = {
+    'claps': 'clap_count DESC',
+    'published': 'published_at DESC',
+    'reading-time': 'reading_time DESC',
+    'words': 'word_count DESC',
+    'title': 'title COLLATE NOCASE',
+}
+
+logger = logging.getLogger(__name__)
+
+
+def post_id_from_slug(slug):
+    """Return the post id Medium appends to every unique slug."""
+    return slug.rsplit('-', 1)[-1]
+
+
+def word_count(markdown_content):
+    """Return the number of whitespace-separated words of an article's markdown."""
+    return len(markdown_content.split())
+
+
+def clap_range_start(clap_range):
+    """Return the lowest clap count of a clap range folder name like `1000-1499`, or None."""
+    start = str(clap_range).split('-')[0]
+    return int(start) if start.isdigit() else None
+
+
+def markdown_title(markdown_content):
+    """Return the first heading of an article's markdown, or its first line."""
+    lines = [line.strip() for line in markdown_content.splitlines() if line.strip()]
+    for line in lines:
+        if line.startswith('#'):
+            return line.lstrip('#').strip()
+    return lines[0] if lines else None
+
+
+def content_hash(content):
+    """Return the SHA-256 hex digest of article content."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+class CrawlIndex:
+    """Persistent SQLite index of downloaded articles, keyed by post id.
+
+    Replaces walking the whole articles tree at startup: membership checks are a
+    primary-key lookup and every saved article is recorded as soon as it is
+    written. The first time an index is opened over an existing tree, the tree
+    is imported once. It also holds the per-tag feed checkpoints used by `--resume`.
+
+    Each article row doubles as its catalog entry (title, author, exact clap
+    count, reading time, publish date, word count), with the post's tags in
+    `article_tags`, so `search` answers tag and clap queries from indexes.
+    """
+
+    def __init__(self, articles_directory):
+        self.articles_directory = articles_directory
+        os.makedirs(articles_directory, exist_ok=True)
+        self.path = os.path.join(articles_directory, INDEX_FILE_NAME)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                post_id TEXT PRIMARY KEY,
+                slug TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                clap_range TEXT NOT NULL,
+                path TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS articles_slug ON articles (slug);
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                tag TEXT PRIMARY KEY,
+                next_from INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS claims (
+                post_id TEXT PRIMARY KEY,
+                claimed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS article_tags (
+                tag TEXT NOT NULL,
+                post_id TEXT NOT NULL,
+                PRIMARY KEY (tag, post_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS article_tags_post_id ON article_tags (post_id);
+        """)
+        self._add_catalog_columns()
+        self.connection.commit()
+        if self._get_meta('imported_at') is None:
+            imported = self.import_tree()
+            logger.info("Imported %d existing articles into %s", imported, self.path)
+        elif self._get_meta('catalog_backfilled_at') is None:
+            backfilled = self.backfill_catalog()
+            logger.info("Added %d indexed articles to the catalog", backfilled)
+
+    def _add_catalog_columns(self):
+        """Add the catalog columns and their indexes to an index created before the catalog existed."""
+        existing = {row[1] for row in self.connection.execute('PRAGMA table_info(articles)')}
+        for column, column_type in CATALOG_COLUMNS.items():
+            if column not in existing:
+                self.connection.execute(f'ALTER TABLE articles ADD COLUMN {column} {column_type}')
+        self.connection.executescript("""
+            CREATE INDEX IF NOT EXISTS articles_clap_count ON articles (clap_count);
+            CREATE INDEX IF NOT EXISTS articles_published_at ON articles (published_at);
+            CREATE INDEX IF NOT EXISTS articles_author ON articles (author);
+        """)
+
+    def __contains__(self, post_id):
+        row = self.connection.execute('SELECT 1 FROM articles WHERE post_id = ?', (post_id,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+    def _get_meta(self, key):
+        row = self.connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def record(self, post_id, slug, tag, clap_range, path, content_hash, fetched_at=None, title=None, author=None,
+               clap_count=None, reading_time=None, published_at=None, word_count=None, tags=()):
+        """Record a saved article and its catalog entry, replacing any earlier entry for the same post."""
+        self.connection.execute(
+            'INSERT OR REPLACE INTO articles (post_id, slug, tag, clap_range, path, content_hash, fetched_at, '
+            'title, author, clap_count, reading_time, published_at, word_count) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (post_id, slug, tag, str(clap_range), path, content_hash, fetched_at or time.time(),
+             title, author, clap_count, reading_time, published_at, word_count))
+        self._set_tags(post_id, [tag, *tags])
+        self.connection.commit()
+
+    def update_catalog(self, post_id, title=None, author=None, clap_count=None, reading_time=None,
+                       published_at=None, word_count=None, tags=()):
+        """Fill in the catalog entry of an indexed article; None leaves a field unchanged."""
+        self.connection.execute(
+            'UPDATE articles SET title = COALESCE(?, title), author = COALESCE(?, author), '
+            'clap_count = COALESCE(?, clap_count), reading_time = COALESCE(?, reading_time), '
+            'published_at = COALESCE(?, published_at), word_count = COALESCE(?, word_count) WHERE post_id = ?',
+            (title, author, clap_count, reading_time, published_at, word_count, post_id))
+        self._set_tags(post_id, tags)
+        self.connection.commit()
+
+    def _set_tags(self, post_id, tags):
+        self.connection.executemany('INSERT OR IGNORE INTO article_tags (tag, post_id) VALUES (?, ?)',
+                                    [(tag, post_id) for tag in dict.fromkeys(tags) if tag])
+
+    def search(self, tag=None, author=None, min_claps=None, published_after=None, sort='claps', limit=None):
+        """Return the catalog entries matching every given filter, as dicts with their tags.
+
+        `published_after` is a Unix timestamp; `sort` is one of `CATALOG_SORTS`.
+        """
+        conditions, parameters = [], []
+        if tag:
+            conditions.append('post_id IN (SELECT post_id FROM article_tags WHERE tag = ?)')
+            parameters.append(tag)
+        if author:
+            conditions.append('author = ?')
+            parameters.append(author)
+        if min_claps is not None:
+            conditions.append('clap_count >= ?')
+            parameters.append(min_claps)
+        if published_after is not None:
+            conditions.append('published_at >= ?')
+            parameters.append(published_after)
+        query = ('SELECT post_id, title, author, clap_count, reading_time, published_at, word_count, path, '
+                 '(SELECT group_concat(tag) FROM article_tags WHERE article_tags.post_id = articles.post_id) AS tags '
+                 'FROM articles')
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += f' ORDER BY {CATALOG_SORTS[sort]}, post_id'
+        if limit:
+            query += ' LIMIT ?'
+            parameters.append(limit)
+        cursor = self.connection.execute(query, parameters)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def articles(self):
+        """Return `(post_id, path)` of every indexed article."""
+        return self.connection.execute('SELECT post_id, path FROM articles').fetchall()
+
+    def update_content_hash(self, post_id, content_hash):
+        self.connection.execute('UPDATE articles SET content_hash = ? WHERE post_id = ?', (content_hash, post_id))
+        self.connection.commit()
+
+    def get_checkpoint(self, tag):
+        """Return `(next_from, updated_at)` of a tag's last successful feed page, or None."""
+        return self.connection.execute('SELECT next_from, updated_at FROM checkpoints WHERE tag = ?', (tag,)).fetchone()
+
+    def save_checkpoint(self, tag, next_from):
+        """Durably record the feed offset to continue a tag from."""
+        self.connection.execute('INSERT OR REPLACE INTO checkpoints (tag, next_from, updated_at) VALUES (?, ?, ?)',
+                                (tag, int(next_from), time.time()))
+        self.connection.commit()
+
+    def clear_checkpoint(self, tag):
+        self.connection.execute('DELETE FROM checkpoints WHERE tag = ?', (tag,))
+        self.connection.commit()
+
+    def claim(self, post_id):
+        """Atomically claim a post for this process; False if another process already has it."""
+        cursor = self.connection.execute('INSERT OR IGNORE INTO claims (post_id, claimed_at) VALUES (?, ?)',
+                                         (post_id, time.time()))
+        self.connection.commit()
+        return cursor.rowcount == 1
+
+    def release(self, post_id):
+        """Give up the claim on a post whose fetch failed."""
+        self.connection.execute('DELETE FROM claims WHERE post_id = ?', (post_id,))
+        self.connection.commit()
+
+    def clear_claims(self):
+        """Forget the claims of a previous parallel run."""
+        self.connection.execute('DELETE FROM claims')
+        self.connection.commit()
+
+    def import_tree(self):
+        """Import the articles already saved as `<tag>/<clap_range>/<slug>/<slug>.md`."""
+        imported = 0
+        for root, dirs, files in os.walk(self.articles_directory):
+            for file in files:
+                if not file.endswith(".md"):
+                    continue
+                file_path = os.path.join(root, file)
+                slug = file.lower().removesuffix(".md").strip()
+                parts = os.path.relpath(file_path, self.articles_directory).split(os.sep)
+                tag, clap_range = (parts[0], parts[1]) if len(parts) >= 4 else ('', '')
+                with open(file_path, 'rb') as article:
+                    content = article.read()
+                markdown_content = content.decode('utf-8', errors='replace')
+                # The first copy wins when the same post was saved under several tags. Only the
+                # clap range is known for these, so the catalog gets its lowest clap count
+                cursor = self.connection.execute(
+                    'INSERT OR IGNORE INTO articles (post_id, slug, tag, clap_range, path, content_hash, fetched_at, '
+                    'title, clap_count, word_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (post_id_from_slug(slug), slug, tag, clap_range, file_path, content_hash(content),
+                     os.path.getmtime(file_path), markdown_title(markdown_content), clap_range_start(clap_range),
+                     word_count(markdown_content)))
+                imported += cursor.rowcount
+                self._set_tags(post_id_from_slug(slug), [tag])
+        self._set_meta('imported_at', time.time())
+        self._set_meta('catalog_backfilled_at', time.time())
+        self.connection.commit()
+        return imported
+
+    def backfill_catalog(self):
+        """Fill the catalog entries of articles indexed before the catalog existed from their markdown files."""
+        rows = self.connection.execute('SELECT post_id, tag, clap_range, path FROM articles WHERE title IS NULL').fetchall()
+        backfilled = 0
+        for post_id, tag, clap_range, path in rows:
+            self._set_tags(post_id, [tag])
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8', errors='replace') as article:
+                markdown_content = article.read()
+            self.connection.execute(
+                'UPDATE articles SET title = ?, clap_count = COALESCE(clap_count, ?), word_count = ? WHERE post_id = ?',
+                (markdown_title(markdown_content), clap_range_start(clap_range), word_count(markdown_content), post_id))
+            backfilled += 1
+        self._set_meta('catalog_backfilled_at', time.time())
+        self.connection.commit()
+        return backfilled
+
+    def close(self):
+        self.connection.close()
+
+
+class PageCheckpoints:
+    """Article jobs still outstanding per feed page of a tag, checkpointing the tag past its finished pages.
+
+    Pages are numbered in feed order, and a page is finished once each of its
+    jobs is saved, skipped or dead-lettered; a job waiting in the retry queue
+    keeps its page open, since the retry queue is not kept across runs. The
+    checkpoint moves past a page only when it and every page before it are
+    finished, so `--resume` never skips an unfinished article, even while the
+    async engine runs ahead on later pages. The last page of a tag is added
+    without a next offset, and the checkpoint is cleared once it is finished.
+    """
+
+    def __init__(self, crawl_index, tag_slug):
+        self.crawl_index = crawl_index
+        self.tag_slug = tag_slug
+        self.outstanding = {}
+        self.next_offsets = {}
+        # The page of every outstanding job; a job is the same dict through all of its attempts
+        self.job_pages = {}
+        self.added = 0
+        # Pages numbered below this one are behind the checkpoint
+        self.checkpointed = 0
+
+    def add_page(self, next_offset, jobs):
+        """Register the article jobs of the next page, followed by the page at `next_offset` (None for the last)."""
+        page = self.added
+        self.added += 1
+        self.outstanding[page] = len(jobs)
+        self.next_offsets[page] = next_offset
+        for job in jobs:
+            self.job_pages[id(job)] = page
+        self._advance()
+
+    def job_done(self, job):
+        """Count a job as saved, skipped or dead-lettered."""
+        self.outstanding[self.job_pages.pop(id(job))] -= 1
+        self._advance()
+
+    def _advance(self):
+        advanced = False
+        while self.checkpointed < self.added and self.outstanding[self.checkpointed] == 0:
+            del self.outstanding[self.checkpointed]
+            next_offset = self.next_offsets.pop(self.checkpointed)
+            self.checkpointed += 1
+            advanced = True
+        if not advanced:
+            return
+        if next_offset is None:
+            # The feed was walked to the end or caught up, so the next run starts from the top again
+            self.crawl_index.clear_checkpoint(self.tag_slug)
+        else:
+            self.crawl_index.save_checkpoint(self.tag_slug, next_offset)
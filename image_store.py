@@ -0,0 +1,158 @@
+import hashlib
+import mimetypes
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+IMAGE_STORE_DIRECTORY_NAME = '.images'
+# Images are streamed to disk in chunks of this size and never held in memory whole
+CHUNK_SIZE = 1024 * 1024
+
+EXTENSIONS = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/jpg': '.jpg',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/avif': '.avif',
+    'image/svg+xml': '.svg',
+}
+
+
+def extension_for_content_type(content_type):
+    """Return the file extension for a Content-Type header value."""
+    mime_type = (content_type or '').split(';')[0].strip().lower()
+    return EXTENSIONS.get(mime_type) or mimetypes.guess_extension(mime_type) or '.bin'
+
+
+class ImageWriter:
+    """Stream an image body to a temporary file while hashing it."""
+
+    def __init__(self, directory):
+        self.file = tempfile.NamedTemporaryFile(dir=directory, prefix='.download-', delete=False)
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk):
+        self.hash.update(chunk)
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.file.name):
+            os.remove(self.file.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.discard()
+
+
+class ImageStore:
+    """Content-addressed store holding one copy of every downloaded image.
+
+    Objects live at `<root>/<first two hex digits>/<sha256><extension>` and are
+    hard-linked (or, across file systems, relatively symlinked) into each
+    article's `images/` folder. The URL of every image is recorded with its
+    ETag and Last-Modified validators, so re-crawls can use conditional GETs,
+    and an image already fetched in this run is not requested again.
+    """
+
+    def __init__(self, articles_directory):
+        self.root = os.path.join(articles_directory, IMAGE_STORE_DIRECTORY_NAME)
+        os.makedirs(self.root, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(self.root, 'index.sqlite'), timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        # The store can always be re-fetched, so skip the fsync on every commit
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                extension TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.connection.commit()
+        # URLs fetched or revalidated by this process, which need no further request
+        self.fresh_urls = set()
+
+    def object_path(self, digest, extension):
+        return os.path.join(self.root, digest[:2], f"{digest}{extension}")
+
+    def lookup(self, url):
+        """Return the stored object path of an image URL, or None if it is not stored."""
+        row = self.connection.execute('SELECT digest, extension FROM images WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        path = self.object_path(*row)
+        return path if os.path.exists(path) else None
+
+    def conditional_headers(self, url):
+        """Return the If-None-Match/If-Modified-Since headers for re-fetching a stored image."""
+        row = self.connection.execute('SELECT digest, extension, etag, last_modified FROM images WHERE url = ?',
+                                      (url,)).fetchone()
+        if row is None or not os.path.exists(self.object_path(row[0], row[1])):
+            return {}
+        headers = {}
+        if row[2]:
+            headers['If-None-Match'] = row[2]
+        if row[3]:
+            headers['If-Modified-Since'] = row[3]
+        return headers
+
+    def writer(self):
+        return ImageWriter(self.root)
+
+    def commit(self, url, writer, headers):
+        """Move a finished download into the store and record its URL; returns the object path."""
+        writer.file.close()
+        digest = writer.hash.hexdigest()
+        extension = extension_for_content_type(headers.get('Content-Type'))
+        path = self.object_path(digest, extension)
+        if os.path.exists(path):
+            # Same bytes already stored under another URL or article
+            os.remove(writer.file.name)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(writer.file.name, path)
+        self.connection.execute(
+            'INSERT OR REPLACE INTO images (url, digest, extension, etag, last_modified, fetched_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (url, digest, extension, headers.get('ETag'), headers.get('Last-Modified'), time.time()))
+        self.connection.commit()
+        self.fresh_urls.add(url)
+        return path
+
+    def revalidated(self, url):
+        """Mark a stored image as confirmed unchanged by a 304 response; returns its object path."""
+        self.connection.execute('UPDATE images SET fetched_at = ? WHERE url = ?', (time.time(), url))
+        self.connection.commit()
+        self.fresh_urls.add(url)
+        return self.lookup(url)
+
+    @staticmethod
+    def link(object_path, images_directory):
+        """Link a stored object into an article's images folder; returns the link path."""
+        os.makedirs(images_directory, exist_ok=True)
+        link_path = os.path.join(images_directory, os.path.basename(object_path))
+        if os.path.lexists(link_path):
+            return link_path
+        try:
+            os.link(object_path, link_path)
+        except OSError:
+            try:
+                os.symlink(os.path.relpath(object_path, images_directory), link_path)
+            except OSError:
+                shutil.copyfile(object_path, link_path)
+        return link_path
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,225 @@
+import contextlib
+import cProfile
+import json
+import logging
+import math
+import os
+import pstats
+import threading
+import time
+from collections import Counter
+
+REPORTS_DIRECTORY_NAME = '.reports'
+# Histogram buckets per doubling of the value; 4 keeps percentile estimates within 19%
+BUCKETS_PER_OCTAVE = 4
+
+
+def configure_logging(verbosity=0):
+    """Log warnings only by default; `-v` adds progress messages and `-vv` every file and image."""
+    level = {0: logging.WARNING, 1: logging.INFO}.get(verbosity, logging.DEBUG)
+    logging.basicConfig(level=level, format='%(asctime)s %(levelname)s %(processName)s: %(message)s', force=True)
+
+
+def reports_directory(articles_directory):
+    directory = os.path.join(articles_directory, REPORTS_DIRECTORY_NAME)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def run_stamp():
+    """A name for the files of this run, unique per process."""
+    return f"{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+
+
+class Histogram:
+    """Count, sum, extremes and log-spaced buckets of observed values (seconds or bytes).
+
+    Bucket bounds are powers of `2 ** (1 / BUCKETS_PER_OCTAVE)` and bucket `b`
+    counts the values up to `b`, so percentiles are estimated from the upper
+    bound of a bucket without keeping every sample.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = Counter()
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.buckets[self._bucket(value)] += 1
+
+    @staticmethod
+    def _bucket(value):
+        if value <= 0:
+            return 0.0
+        return 2.0 ** (math.ceil(math.log2(value) * BUCKETS_PER_OCTAVE) / BUCKETS_PER_OCTAVE)
+
+    def percentile(self, fraction):
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound in sorted(self.buckets):
+            seen += self.buckets[bound]
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def merge(self, data):
+        """Add the observations of a histogram serialized by `to_dict`."""
+        if not data['count']:
+            return
+        self.count += data['count']
+        self.total += data['sum']
+        self.min = data['min'] if self.min is None else min(self.min, data['min'])
+        self.max = data['max'] if self.max is None else max(self.max, data['max'])
+        self.buckets.update({float(bound): count for bound, count in data['buckets'].items()})
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets': {repr(bound): count for bound, count in sorted(self.buckets.items())},
+        }
+
+
+class Metrics:
+    """Counters and histograms of one crawl, safe to update from the parsing threads of the async engine.
+
+    Counter names are dotted (`requests.article`, `articles.skipped.known`); histograms of
+    durations end in `.seconds` and histograms of sizes in `.bytes`.
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def observe(self, name, value):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """Observe the wall time of the block under `<stage>.seconds`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f"{stage}.seconds", time.perf_counter() - started)
+
+    def prefixed(self, prefix):
+        """Return the counters starting with `prefix`, keyed by the rest of their name."""
+        return Counter({name[len(prefix):]: count for name, count in self.counters.items() if name.startswith(prefix)})
+
+    def merge(self, data):
+        """Add the counters and histograms of metrics serialized by `to_dict`, e.g. from a worker process."""
+        with self._lock:
+            self.counters.update(data['counters'])
+            for name, histogram_data in data['histograms'].items():
+                self.histograms.setdefault(name, Histogram()).merge(histogram_data)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'counters': dict(sorted(self.counters.items())),
+                'histograms': {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+            }
+
+    def summary(self):
+        """Return the human-readable end-of-run lines: requests per article and time spent per stage."""
+        fetched = self.counters['articles.fetched']
+        request_counts = self.prefixed('requests.')
+        total = sum(request_counts.values())
+        lines = [f"Made {total} requests for {fetched} articles ({total / fetched if fetched else 0:.2f} per article)"]
+        for kind, count in sorted(request_counts.items()):
+            lines.append(f"  {kind}: {count} ({count / fetched if fetched else 0:.2f} per article)")
+        stages = [(name[:-len('.seconds')], histogram) for name, histogram in sorted(self.histograms.items())
+                  if name.endswith('.seconds')]
+        if stages:
+            lines.append("Time per stage (total, p50, p95, max):")
+            for stage, histogram in stages:
+                lines.append(f"  {stage}: {histogram.total:.2f}s over {histogram.count}, "
+                             f"{histogram.percentile(0.5) * 1000:.1f}ms, {histogram.percentile(0.95) * 1000:.1f}ms, "
+                             f"{histogram.max * 1000:.1f}ms")
+        sizes = [(name[:-len('.bytes')], histogram) for name, histogram in sorted(self.histograms.items())
+                 if name.endswith('.bytes')]
+        if sizes:
+            lines.append("Bytes per response (total, mean, max):")
+            for kind, histogram in sizes:
+                lines.append(f"  {kind}: {histogram.total / 1024 ** 2:.2f} MiB over {histogram.count}, "
+                             f"{histogram.total / histogram.count / 1024:.1f} KiB, {histogram.max / 1024:.1f} KiB")
+        other = {name: count for name, count in self.counters.items() if not name.startswith('requests.')}
+        if other:
+            lines.append("Counters: " + ", ".join(f"{name}={count}" for name, count in sorted(other.items())))
+        return lines
+
+
+class RequestLog:
+    """Append one JSON line per HTTP request: kind, method, URL, status, seconds and bytes."""
+
+    def __init__(self, path):
+        self.path = path
+        # Line-buffered, so worker processes that exit without flushing lose nothing
+        self._file = open(path, 'a', encoding='utf-8', buffering=1)
+        self._lock = threading.Lock()
+
+    def write(self, kind, method, url, status, seconds, size=None, error=None):
+        record = {'time': time.time(), 'kind': kind, 'method': method, 'url': url, 'status': status,
+                  'seconds': round(seconds, 6), 'bytes': size}
+        if error is not None:
+            record['error'] = error
+        with self._lock:
+            self._file.write(json.dumps(record) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+def write_run_report(path, metrics, **details):
+    """Write the JSON report of a run: `details` (arguments, timings) plus every counter and histogram."""
+    report = {**details, **metrics.to_dict()}
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, default=str)
+    return path
+
+
+class Profiler:
+    """cProfile around a block of work, dumped to `path` when it ends (a no-op without a path)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.profile = cProfile.Profile() if path else None
+
+    def __enter__(self):
+        if self.profile is not None:
+            self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.path)
+
+    def print_top(self, limit=20):
+        if self.profile is not None:
+            print(f"Profile written to {self.path}; top {limit} functions by cumulative time:")
+            pstats.Stats(self.profile).sort_stats('cumulative').print_stats(limit)
@@ -0,0 +1,90 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import scrap
+from crawl_index import CrawlIndex
+from instrumentation import Metrics, Profiler, configure_logging
+
+logger = logging.getLogger(__name__)
+
+# The scraper and profiler of the current worker process, created once by `_init_worker`
+_worker_scraper = None
+_worker_profiler = None
+
+
+def _init_worker(scraper_options, verbosity, profile):
+    global _worker_scraper, _worker_profiler
+    configure_logging(verbosity)
+    _worker_scraper = scrap.MediumScraper(tag_slugs=[], claim_posts=True, **scraper_options)
+    # One profile per worker, accumulated over its jobs and rewritten after each of them
+    _worker_profiler = Profiler(f"{profile}.{os.getpid()}" if profile else None)
+
+
+def _scrap_tag_job(tag_slug):
+    """Scrape one tag in a worker process and return its metrics."""
+    scraper = _worker_scraper
+    scraper.metrics = Metrics()
+    started = time.perf_counter()
+    with _worker_profiler:
+        scraper._scrap_tag(tag_slug)
+    return {
+        'tag': tag_slug,
+        'pid': os.getpid(),
+        'seconds': time.perf_counter() - started,
+        'metrics': scraper.metrics.to_dict(),
+    }
+
+
+class ParallelCrawl:
+    """Crawl tags across a pool of worker processes fed from one shared work queue.
+
+    Each tag is a job on the pool's queue, so idle workers pick up the next tag
+    while busy ones are still converting articles. Workers share the on-disk
+    crawl index and claim every post in it before fetching, so a post surfaced
+    by two tags at once is only converted by one of them. The metrics of every
+    job are merged into `metrics`, which may already hold the requests of the
+    parent process (its followed tags lookup) so the report counts them too.
+    """
+
+    def __init__(self, tag_slugs, processes, scraper_options=None, verbosity=0, profile=None, metrics=None):
+        self.tag_slugs = list(tag_slugs)
+        self.processes = processes
+        self.scraper_options = scraper_options or {}
+        self.verbosity = verbosity
+        self.profile = profile
+        self.metrics = metrics if metrics is not None else Metrics()
+
+    def run(self):
+        """Run every tag to completion, printing progress and a combined report."""
+        crawl_index = CrawlIndex(scrap.ARTICLES_DIRECTORY)
+        crawl_index.clear_claims()
+        crawl_index.close()
+
+        results = []
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                 initargs=(self.scraper_options, self.verbosity, self.profile)) as executor:
+            futures = {executor.submit(_scrap_tag_job, tag_slug): tag_slug for tag_slug in self.tag_slugs}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception:
+                    logger.exception("Tag '%s' failed", futures[future])
+                    continue
+                results.append(result)
+                self.metrics.merge(result['metrics'])
+                logger.info("[%d/%d] Finished tag '%s' in worker %s: %d articles saved in %.1fs", len(results),
+                            len(self.tag_slugs), result['tag'], result['pid'],
+                            result['metrics']['counters'].get('articles.saved', 0), result['seconds'])
+        self.print_report(results, time.perf_counter() - started)
+        return results
+
+    def print_report(self, results, elapsed):
+        saved = self.metrics.counters['articles.saved']
+        print(f"Crawled {len(results)}/{len(self.tag_slugs)} tags with {self.processes} processes in {elapsed:.1f}s")
+        print(f"Saved {saved} of {self.metrics.counters['articles.fetched']} fetched articles "
+              f"({saved / elapsed if elapsed else 0:.2f} articles/s)")
+        for line in self.metrics.summary():
+            print(line)
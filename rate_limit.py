@@ -0,0 +1,171 @@
+import heapq
+import itertools
+import json
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+# Responses that mean the server wants us to slow down or try again later
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# Request kinds counted by the scraper, mapped to the budget they draw from
+BUDGETS = {
+    'graphql_tags': 'graphql',
+    'graphql_feed': 'graphql',
+    'graphql_claps': 'graphql',
+    'article': 'article',
+    'image': 'image',
+}
+
+logger = logging.getLogger(__name__)
+
+
+class FetchError(Exception):
+    """A request that failed; `retryable` failures go to the retry queue instead of ending the crawl."""
+
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Return the seconds to wait from a Retry-After header (seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket whose rate adapts to the server (additive increase, multiplicative decrease).
+
+    The rate starts at half of `max_rate` and climbs by `increase` requests/s
+    after every successful response. A 429 or 5xx halves it, at most once per
+    `cooldown` seconds so a burst of concurrent failures counts as one, and a
+    Retry-After header blocks the bucket until that time has passed.
+    """
+
+    def __init__(self, max_rate, burst=1, min_rate=0.05, increase=0.05, cooldown=1.0):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = max(self.min_rate, max_rate / 2)
+        self.burst = burst
+        self.increase = increase
+        self.cooldown = cooldown
+        self.decreased_at = float('-inf')
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self):
+        """Take a token; returns the seconds to wait before sending the request."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # Tokens may go negative: each waiter is scheduled one interval after the previous one
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def on_response(self, status, retry_after=None):
+        if status in RETRYABLE_STATUSES:
+            now = time.monotonic()
+            if now - self.decreased_at >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.decreased_at = now
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+        elif status < 400:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+class RateLimiter:
+    """One adaptive token bucket per budget: the GraphQL endpoint, article pages and the image CDN."""
+
+    def __init__(self, graphql_rate=4.0, article_rate=2.0, image_rate=10.0):
+        self.buckets = {
+            'graphql': TokenBucket(graphql_rate),
+            'article': TokenBucket(article_rate),
+            'image': TokenBucket(image_rate, burst=4),
+        }
+
+    def reserve(self, kind):
+        return self.buckets[BUDGETS[kind]].reserve()
+
+    def wait(self, kind):
+        """Block until a request of `kind` may be sent; returns the seconds slept."""
+        delay = self.reserve(kind)
+        if delay > 0:
+            time.sleep(delay)
+        return max(delay, 0.0)
+
+    def on_response(self, kind, status, retry_after=None):
+        self.buckets[BUDGETS[kind]].on_response(status, retry_after)
+
+    def rates(self):
+        return {name: round(bucket.rate, 2) for name, bucket in self.buckets.items()}
+
+
+class RetryQueue:
+    """Failed jobs waiting for another attempt, with exponential backoff and a dead-letter list.
+
+    A job that fails `max_attempts` times is appended to the dead-letter JSONL
+    file instead of being rescheduled.
+    """
+
+    def __init__(self, dead_letter_path, max_attempts=5, base_delay=2.0, max_delay=300.0):
+        self.dead_letter_path = dead_letter_path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_letters = []
+        self._heap = []
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def backoff(self, attempt, retry_after=None):
+        """Seconds to wait before attempt number `attempt + 1`, with jitter."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        return max(delay, retry_after or 0)
+
+    def schedule(self, job, error):
+        """Queue a failed job for another attempt; returns False when it was dead-lettered instead."""
+        job['attempts'] = job.get('attempts', 0) + 1
+        job['error'] = str(error)
+        retryable = getattr(error, 'retryable', True)
+        if not retryable or job['attempts'] >= self.max_attempts:
+            self.dead_letter(job)
+            return False
+        due = time.monotonic() + self.backoff(job['attempts'], getattr(error, 'retry_after', None))
+        heapq.heappush(self._heap, (due, next(self._order), job))
+        logger.info("Retrying %s in %.0fs (attempt %d): %s", job.get('url'), due - time.monotonic(), job['attempts'] + 1, error)
+        return True
+
+    def dead_letter(self, job):
+        logger.warning("Giving up on %s after %d attempts: %s", job.get('url'), job['attempts'], job['error'])
+        self.dead_letters.append(job)
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({**job, 'failed_at': time.time()}, default=str) + '\n')
+
+    def pop_due(self):
+        """Remove and return every job whose backoff has elapsed."""
+        now = time.monotonic()
+        jobs = []
+        while self._heap and self._heap[0][0] <= now:
+            jobs.append(heapq.heappop(self._heap)[2])
+        return jobs
+
+    def next_due_in(self):
+        """Seconds until the next job is due, or None when the queue is empty."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import scrap
+from crawl_index import CrawlIndex, content_hash, word_count
+from image_store import ImageStore
+from instrumentation import configure_logging
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# The cache and image store of the current worker process, opened once by `_init_worker`
+_worker_cache = None
+_worker_image_store = None
+
+
+def _init_worker(articles_directory, verbosity):
+    global _worker_cache, _worker_image_store
+    configure_logging(verbosity)
+    _worker_cache = ResponseCache(articles_directory)
+    _worker_image_store = ImageStore(articles_directory)
+
+
+def _rebuild_article(job):
+    """Re-render one cached article to its markdown file.
+
+    Returns its post id, new content hash and catalog fields (from the cached feed data, when kept).
+    """
+    post_id, file_path = job
+    content = _worker_cache.get(post_id, 'html')
+    if content is None:
+        return post_id, None, None
+    markdown_content, image_info_list = scrap.MediumScraper._convert_article_html(content)
+    if markdown_content is None:
+        return post_id, None, None
+    article_folder = os.path.dirname(file_path)
+    image_paths = []
+    for image_url, placeholder in image_info_list:
+        object_path = _worker_image_store.lookup(image_url)
+        if object_path is None:
+            # Never downloaded, and there is no network here: link the remote image
+            image_paths.append((placeholder, image_url))
+            continue
+        image_path = ImageStore.link(object_path, os.path.join(article_folder, "images"))
+        image_paths.append((placeholder, os.path.relpath(image_path, article_folder)))
+    markdown_content = scrap.MediumScraper._replace_image_placeholders(markdown_content, image_paths)
+    os.makedirs(article_folder, exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.write(markdown_content)
+    entry = {}
+    feed_data = _worker_cache.get(post_id, 'graphql')
+    if feed_data is not None:
+        feed_data = json.loads(feed_data)
+        entry = scrap.MediumScraper._catalog_entry(feed_data['post'], feed_data['clapCount'])
+    entry['word_count'] = word_count(markdown_content)
+    return post_id, content_hash(markdown_content), entry
+
+
+class CacheRebuild:
+    """Rebuild the markdown of every cached article from its raw HTML, without network access.
+
+    Articles are re-rendered in a process pool with the current conversion
+    settings and written back to the paths recorded in the crawl index. Images
+    are linked from the image store; images that were never downloaded keep
+    their remote URL. Catalog entries are refreshed from the cached feed data.
+    """
+
+    def __init__(self, processes, verbosity=0):
+        self.processes = processes
+        self.verbosity = verbosity
+
+    def run(self):
+        articles_directory = scrap.ARTICLES_DIRECTORY
+        crawl_index = CrawlIndex(articles_directory)
+        cache = ResponseCache(articles_directory)
+        cached = set(cache.post_ids('html'))
+        cache.close()
+        jobs = [(post_id, path) for post_id, path in crawl_index.articles() if post_id in cached]
+        logger.info("Rebuilding %d cached articles with %d processes", len(jobs), self.processes)
+
+        rebuilt = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                 initargs=(articles_directory, self.verbosity)) as executor:
+            for post_id, digest, entry in executor.map(_rebuild_article, jobs, chunksize=32):
+                if digest is None:
+                    logger.warning("No article section in the cached page of post %s", post_id)
+                    continue
+                crawl_index.update_content_hash(post_id, digest)
+                crawl_index.update_catalog(post_id, **entry)
+                rebuilt += 1
+                if rebuilt % 1000 == 0:
+                    logger.info("Rebuilt %d/%d articles", rebuilt, len(jobs))
+        elapsed = time.perf_counter() - started
+        crawl_index.close()
+        print(f"Rebuilt {rebuilt} articles in {elapsed:.1f}s ({rebuilt / elapsed if elapsed else 0:.1f} articles/s)")
+        return rebuilt
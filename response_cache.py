@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    # zstd is optional; records are zlib-compressed without it
+    zstandard = None
+
+CACHE_DIRECTORY_NAME = '.cache'
+
+
+def _compress(data):
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'zlib', zlib.compress(data, 9)
+
+
+def _decompress(codec, data):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("This cache record is zstd-compressed; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class ResponseCache:
+    """Compressed raw responses (article HTML, feed GraphQL JSON) per post id.
+
+    Records are appended to pack files and located through a SQLite index of
+    `(post_id, kind) -> (pack, offset, length, codec)`. Every cache instance
+    appends to its own pack, so crawl processes running in parallel never
+    interleave their writes. A newer record for the same post and kind
+    replaces the older one in the index.
+    """
+
+    def __init__(self, articles_directory):
+        self.root = os.path.join(articles_directory, CACHE_DIRECTORY_NAME)
+        os.makedirs(self.root, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(self.root, 'index.sqlite'), timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                post_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                pack TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                codec TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (post_id, kind)
+            )
+        """)
+        self.connection.commit()
+        self.pack_name = f"responses-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}.pack"
+        self._pack = None
+        self._readers = {}
+
+    def put(self, post_id, kind, data):
+        """Compress and append one raw response."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        codec, compressed = _compress(data)
+        if self._pack is None:
+            self._pack = open(os.path.join(self.root, self.pack_name), 'ab')
+        offset = self._pack.seek(0, os.SEEK_END)
+        self._pack.write(compressed)
+        self._pack.flush()
+        self.connection.execute(
+            'INSERT OR REPLACE INTO responses (post_id, kind, pack, offset, length, codec, stored_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (post_id, kind, self.pack_name, offset, len(compressed), codec, time.time()))
+        self.connection.commit()
+
+    def get(self, post_id, kind):
+        """Return the raw bytes of a cached response, or None."""
+        row = self.connection.execute(
+            'SELECT pack, offset, length, codec FROM responses WHERE post_id = ? AND kind = ?',
+            (post_id, kind)).fetchone()
+        if row is None:
+            return None
+        pack, offset, length, codec = row
+        if pack not in self._readers:
+            self._readers[pack] = open(os.path.join(self.root, pack), 'rb')
+        reader = self._readers[pack]
+        reader.seek(offset)
+        return _decompress(codec, reader.read(length))
+
+    def post_ids(self, kind):
+        """Return the ids of every post with a cached response of `kind`."""
+        return [row[0] for row in self.connection.execute('SELECT post_id FROM responses WHERE kind = ?', (kind,))]
+
+    def close(self):
+        if self._pack is not None:
+            self._pack.close()
+        for reader in self._readers.values():
+            reader.close()
+        self.connection.close()
@@ -1,21 +1,73 @@
 import argparse
 import json
+import logging
 import os
-import random
+import re
 import sys
 import time
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from dotenv import load_dotenv
-from markdownify import markdownify as md
-import hashlib
+from markdownify import MarkdownConverter
+
+from crawl_index import (CATALOG_SORTS, CrawlIndex, PageCheckpoints, content_hash, markdown_title, post_id_from_slug,
+                         word_count)
+from image_store import CHUNK_SIZE, ImageStore
+from instrumentation import Metrics, Profiler, RequestLog, configure_logging, reports_directory, run_stamp, write_run_report
+from rate_limit import RETRYABLE_STATUSES, FetchError, RateLimiter, RetryQueue, parse_retry_after
+from response_cache import ResponseCache
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 ARTICLES_DIRECTORY = 'medium-articles'
-GRAPHQL_URL = 'https://medium.com/_/graphql'
+MEDIUM_URL = os.getenv("MEDIUM_URL", 'https://medium.com')
+GRAPHQL_URL = f'{MEDIUM_URL}/_/graphql'
 COOKIE_VALUE = os.getenv("COOKIE")
+REQUEST_TIMEOUT = 30
+DEAD_LETTERS_FILE_NAME = '.dead-letters.jsonl'
+# Only the <article> element of a page is converted, so lxml builds a tree for nothing else
+ARTICLE_ONLY = SoupStrainer('article')
+MARKDOWN_CONVERTER = MarkdownConverter(heading_style="ATX")
+# Image placeholders as they come out of markdownify, with the underscores escaped
+IMAGE_PLACEHOLDER_PATTERN = re.compile(r'\{\{IMAGE\\_PLACEHOLDER\\_\d+\}\}')
+# The feed queries select only what the scraper reads: the article URL, the catalog fields and the paging
+FEED_POST_FRAGMENT = """
+fragment FeedPost_post on Post {
+  id
+  title
+  uniqueSlug
+  clapCount
+  readingTime
+  firstPublishedAt
+  creator { username }
+  tags { id }
+}
+"""
+TAG_FEED_QUERY = """query WebInlineTopicFeedQuery($tagSlug: String!, $paging: PagingOptions!, $skipCache: Boolean) {
+  personalisedTagFeed(tagSlug: $tagSlug, paging: $paging, skipCache: $skipCache) {
+    items { ... on TagFeedItem { post { ...FeedPost_post } } }
+    pagingInfo { next { source limit from to } }
+  }
+}
+""" + FEED_POST_FRAGMENT
+RECOMMENDED_FEED_QUERY = """query WebInlineRecommendedFeedQuery($paging: PagingOptions, $forceRank: Boolean) {
+  webRecommendedFeed(paging: $paging, forceRank: $forceRank) {
+    items { post { ...FeedPost_post } }
+    pagingInfo { next { limit to source } }
+  }
+}
+""" + FEED_POST_FRAGMENT
+FOLLOWED_TAGS_QUERY = """query HomeMainContentHeaderQuery($paging: PagingOptions) {
+  viewer { id followedTags(paging: $paging) { tags { id } } }
+}
+"""
+CLAP_COUNT_QUERY = """query ClapCountQuery($postId: ID!) {
+  postResult(id: $postId) { ... on Post { id clapCount } }
+}
+"""
 HEADERS = {
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
             "Accept-Encoding": "gzip, deflate, br",
@@ -34,102 +86,230 @@ HEADERS = {
         }
 
 class MediumScraper:
-    def __init__(self, mode='select'):
-        self.downloaded_articles = self._generate_downloaded_articles_hashset()
-        self.tag_slugs = self._fetch_tag_slugs()
+    def __init__(self, mode='select', rates=None, feed_clap_counts=False, resume=False, stop_after_known=None,
+                 tag_slugs=None, claim_posts=False, cache_raw=False, request_log=False):
+        # One pooled keep-alive session for every request instead of a fresh connection per call
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        # Adaptive per-endpoint request budgets, and failed article fetches waiting for another attempt
+        self.rate_limiter = RateLimiter(**(rates or {}))
+        self.retry_queue = RetryQueue(os.path.join(ARTICLES_DIRECTORY, DEAD_LETTERS_FILE_NAME))
+        # Counters and per-stage histograms for the end-of-run report, and an optional line per HTTP request
+        self.metrics = Metrics()
+        self.request_log = None
+        if request_log:
+            self.request_log = RequestLog(os.path.join(reports_directory(ARTICLES_DIRECTORY), f"requests-{run_stamp()}.jsonl"))
+        # Claim each post in the shared crawl index before fetching it, when several processes crawl at once
+        self.claim_posts = claim_posts
+        # Take clap counts from the feed response instead of looking them up separately
+        self.feed_clap_counts = feed_clap_counts
+        # Continue tags from their checkpoint, and stop a tag after this many consecutive known posts
+        self.resume = resume
+        self.stop_after_known = stop_after_known
+        self.known_streak = 0
+        # The outstanding article jobs of the current tag's feed pages, which decide its checkpoint
+        self.page_checkpoints = None
+        self.crawl_index = CrawlIndex(ARTICLES_DIRECTORY)
+        self.image_store = ImageStore(ARTICLES_DIRECTORY)
+        # Keep the raw article HTML and feed JSON so markdown can be rebuilt offline
+        self.response_cache = ResponseCache(ARTICLES_DIRECTORY) if cache_raw else None
+        self.tag_slugs = tag_slugs if tag_slugs is not None else self._fetch_tag_slugs()
         self.mode = mode
         self.chosen_tags = None
 
     @staticmethod
-    def is_json(response_text):
+    def _decode_json(response):
+        """Decode a response body once, straight from its bytes; returns None when it is not JSON."""
+        return MediumScraper._decode_json_body(response.content)
+
+    @staticmethod
+    def _decode_json_body(body):
+        """Decode a body already read, for either crawl engine; returns None when it is not JSON."""
         try:
-            # Attempt to parse the text as JSON
-            json.loads(response_text)
-            # If parsing succeeds, return True
-            return True
-        except json.JSONDecodeError:
-            # If an error is raised, the text is not valid JSON
-            return False
+            return json.loads(body)
+        except ValueError:
+            return None
 
     @staticmethod
     def _check_for_errors(response_data):
-        # Check if there's an "errors" key in the response
-        if response_data and "errors" in response_data[0]:
+        # Check if there's an "errors" key in any operation result of the response
+        if response_data and any("errors" in result for result in response_data):
             return True
         else:
             return False
 
+    def _request(self, method, url, kind, **kwargs):
+        """Send a request once its budget allows, counting it under `kind`.
+
+        Connection failures and 429/5xx responses slow the budget down and raise a retryable FetchError.
+        """
+        waited = self.rate_limiter.wait(kind)
+        if waited:
+            self.metrics.observe('sleep.rate_limit.seconds', waited)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=REQUEST_TIMEOUT, **kwargs)
+        except requests.RequestException as error:
+            self._record_request(kind, method, url, None, time.perf_counter() - started, error=repr(error))
+            self.rate_limiter.on_response(kind, 503)
+            raise FetchError(f"{method} {url} failed: {error}") from error
+        size = response.headers.get('Content-Length')
+        if size is None and not kwargs.get('stream'):
+            size = len(response.content)
+        self._record_request(kind, method, url, response.status_code, time.perf_counter() - started,
+                             int(size) if size is not None else None)
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        self.rate_limiter.on_response(kind, response.status_code, retry_after)
+        if response.status_code in RETRYABLE_STATUSES:
+            response.close()
+            raise FetchError(f"{method} {url} returned HTTP {response.status_code}", retry_after=retry_after)
+        return response
+
+    def _record_request(self, kind, method, url, status, seconds, size=None, error=None):
+        """Count a finished request and record its latency and size, for both crawl engines."""
+        self.metrics.count(f'requests.{kind}')
+        if status is None or status in RETRYABLE_STATUSES:
+            self.metrics.count(f'errors.{kind}')
+        self.metrics.observe(f'request.{kind}.seconds', seconds)
+        if size is not None:
+            self.metrics.observe(f'request.{kind}.bytes', size)
+        if self.request_log is not None:
+            self.request_log.write(kind, method, url, status, seconds, size, error)
+
+    def _post_graphql(self, payload, kind):
+        """POST a list of GraphQL operations, counting the request under `kind`."""
+        return self._request('POST', GRAPHQL_URL, kind, json=payload)
+
+    def _get(self, url, kind, **kwargs):
+        """GET a URL, counting the request under `kind`."""
+        return self._request('GET', url, kind, **kwargs)
+
+    def _with_retries(self, operation, description):
+        """Run `operation` until it stops raising FetchError, backing off between attempts.
+
+        For requests later work depends on (feed pages, clap counts); gives up after the
+        retry queue's maximum number of attempts and re-raises the last error.
+        """
+        attempt = 1
+        while True:
+            try:
+                return operation()
+            except FetchError as error:
+                time.sleep(self._retry_delay(error, attempt, description))
+                attempt += 1
+
+    def _retry_delay(self, error, attempt, description):
+        """Return the backoff before retrying `description` after its `attempt`-th failure, for either engine.
+
+        Re-raises `error` when it is not retryable or the attempts are used up.
+        """
+        if not error.retryable or attempt >= self.retry_queue.max_attempts:
+            raise error
+        delay = self.retry_queue.backoff(attempt, error.retry_after)
+        logger.warning("Failed to fetch %s (%s), retrying in %.0fs", description, error, delay)
+        self.metrics.count('retries.inline')
+        self.metrics.observe('sleep.retry_backoff.seconds', delay)
+        return delay
+
     @staticmethod
     def _extract_highest_resolution_image(srcset):
         """Extract the highest resolution image URL from srcset."""
         images = srcset.split(",")
         highest_resolution_image = images[-1].strip().split(" ")[0]
-        # Log the extracted URL
-        print(
-            f"Extracted highest resolution image URL: {highest_resolution_image}")
+        logger.debug("Extracted highest resolution image URL: %s", highest_resolution_image)
         return highest_resolution_image
 
-    @staticmethod
-    def _generate_downloaded_articles_hashset():
-        """Generate a hashset of all downloaded articles' identifiers."""
-        hashset = set()
-        for root, dirs, files in os.walk(ARTICLES_DIRECTORY):
-            for file in files:
-                if file.endswith(".md"):
-                    file_name = file.title().lower().removesuffix(".md").strip()
-                    print(f"Caching file {file_name}")
-                    hashset.add(file_name)
-        return hashset
-
-    @staticmethod
-    def _fetch_tag_slugs():
+    def _fetch_tag_slugs(self):
         payload = [
             {
                 "operationName": "HomeMainContentHeaderQuery",
                 "variables": {},
-                "query": "query HomeMainContentHeaderQuery($paging: PagingOptions) {\n  viewer {\n    ...HomeFeedNavbar_viewer\n    __typename\n  } \n}\n\nfragment HomeFeedNavbar_viewer on User {\n  id\n  followedTags(paging: $paging) {\n    tags {\n      __typename\n         id\n      displayTitle\n    }\n    __typename\n  }\n  __typename\n}\n"
+                "query": FOLLOWED_TAGS_QUERY
             }
         ]
-        response = requests.post(GRAPHQL_URL, headers=HEADERS, json=payload)
-        if MediumScraper.is_json(response.text) and MediumScraper._check_for_errors(response.json()):
-            print(response.text)
+        try:
+            response = self._with_retries(lambda: self._post_graphql(payload, 'graphql_tags'), "followed tags")
+        except FetchError as error:
+            logger.error("Failed to fetch data: %s", error)
             sys.exit(1)
-        if response.status_code == 200:
-            json_response = response.json()
+        json_response = self._decode_json(response)
+        if self._check_for_errors(json_response):
+            logger.error("Failed to fetch the followed tags: %s", response.text)
+            sys.exit(1)
+        if response.status_code == 200 and json_response is not None:
             tags = json_response[0]['data']['viewer']['followedTags']['tags']
             return sorted([(tag['id']) for tag in tags])
         else:
-            print(f"Failed to fetch data {response.status_code}")
-            print(response.text)
+            logger.error("Failed to fetch data: HTTP %s: %s", response.status_code, response.text)
             sys.exit(1)
 
 
     def _download_image(self, image_url, article_folder):
-        images_directory = os.path.join(article_folder, "images")
-        # Ensure base and article-specific folder exists
-        if not os.path.exists(images_directory):
-            os.makedirs(images_directory)
-
-        hashed_image_name = hashlib.md5(image_url.encode()).hexdigest()
-        # Construct the full path for the image
-        image_path = os.path.join(images_directory, f"{hashed_image_name}.png")
-
-        # Download and save the image
-        print(f"Downloading image: {image_url} to {image_path}")
-        response = requests.get(image_url, stream=True, headers=HEADERS)
-        if response.status_code == 200:
-            if self.is_json(response.text) and self._check_for_errors(response.json()):
-                print(response.text)
-                sys.exit(1)
-            with open(image_path, 'wb') as file:
-                for chunk in response.iter_content(1024):
-                    file.write(chunk)
-            print(f"Image saved as {image_path}")
-            # Return the relative path to the image for Markdown linking
-            return os.path.relpath(image_path, article_folder)
-        else:
-            print(f"Failed to download {image_url}")
-            return None
+        object_path = self._stored_image(image_url)
+        if object_path is None:
+            object_path = self._fetch_image(image_url)
+            if object_path is None:
+                return None
+        return self._link_image(object_path, article_folder)
+
+    def _stored_image(self, image_url):
+        """Return the stored object of an image already fetched or revalidated in this run, or None."""
+        object_path = self.image_store.lookup(image_url) if image_url in self.image_store.fresh_urls else None
+        if object_path is not None:
+            self.metrics.count('images.reused')
+        return object_path
+
+    def _link_image(self, object_path, article_folder):
+        """Link a stored image into an article's images folder; returns its path relative to the article."""
+        # Link the single stored copy into the article instead of writing it again
+        image_path = self.image_store.link(object_path, os.path.join(article_folder, "images"))
+        logger.debug("Image saved as %s", image_path)
+        # Return the relative path to the image for Markdown linking
+        return os.path.relpath(image_path, article_folder)
+
+    def _fetch_image(self, image_url):
+        """Download an image into the image store, revalidating a stored copy; returns its object path."""
+        logger.debug("Downloading image: %s", image_url)
+        headers = self.image_store.conditional_headers(image_url)
+        with self._get(image_url, 'image', stream=True, headers=headers) as response:
+            if response.status_code != 200:
+                return self._image_not_downloaded(image_url, response.status_code)
+            content_type = response.headers.get('Content-Type')
+            try:
+                if not self._is_image(content_type):
+                    raise self._not_an_image(image_url, content_type, response.content)
+                with self.image_store.writer() as writer:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        writer.write(chunk)
+            except requests.RequestException as error:
+                # The body broke off while streaming, after `_request` had already returned the response
+                self.rate_limiter.on_response('image', 503)
+                raise FetchError(f"GET {image_url} failed while reading the body: {error!r}") from error
+            return self._store_image(image_url, writer, response.headers)
+
+    def _image_not_downloaded(self, image_url, status):
+        """Handle an image response other than a 200: returns the stored copy for a 304, otherwise None."""
+        if status == 304:
+            self.metrics.count('images.not_modified')
+            return self.image_store.revalidated(image_url)
+        logger.warning("Failed to download %s: HTTP %s", image_url, status)
+        self.metrics.count('images.failed')
+        return None
+
+    def _store_image(self, image_url, writer, headers):
+        """Move a finished image download into the image store; returns its object path."""
+        self.metrics.count('images.downloaded')
+        return self.image_store.commit(image_url, writer, headers)
+
+    @staticmethod
+    def _is_image(content_type):
+        """Whether a response's Content-Type is an image type, for either crawl engine."""
+        return (content_type or '').split(';')[0].strip().lower().startswith('image/')
+
+    @staticmethod
+    def _not_an_image(image_url, content_type, body):
+        """The FetchError for a 200 image response that is something else, e.g. an error payload or a challenge page."""
+        return FetchError(f"Got {content_type or 'no Content-Type'} instead of image {image_url}: {body[:200]!r}")
 
     def _get_clap_range_for_clap_count(self, clap_count):
         """ Determine the clap range folder name based on clap count. """
@@ -138,35 +318,105 @@ class MediumScraper:
         range_start = (clap_count // 500) * 500
         return f"{range_start}-{range_start + 499}"
     
-    # Function to fetch clap count for a given Medium post
-    def _fetch_clap_count(self, post_id):
-        # Define the GraphQL query and variables
-        payload = [
+    @staticmethod
+    def _clap_counts_payload(post_ids):
+        """Build one batched GraphQL payload with a clap count operation per post."""
+        return [
             {
                 "operationName": "ClapCountQuery",
                 "variables": {
                     "postId": f"{post_id}"
                 },
-                "query": "query ClapCountQuery($postId: ID!) {\n  postResult(id: $postId) {\n    __typename\n    ... on Post {\n      id\n      clapCount\n      __typename\n    }\n  }\n}\n"
+                "query": CLAP_COUNT_QUERY
             }
+            for post_id in post_ids
         ]
 
-        response = requests.post(GRAPHQL_URL, headers=HEADERS, json=payload)
-        if self.is_json(response.text) and self._check_for_errors(response.json()):
-            print(response.text)
-            sys.exit(1)
-        if response.status_code == 200:
-            # Parse the JSON response
-            json_data = response.json()
-            # Extract the clap count
-            clap_count = json_data[0].get("data", {}).get(
-                "postResult", {}).get("clapCount", 0)
-            return clap_count
-        else:
-            print(f"Failed to fetch clap count: HTTP {response.status_code}")
-            return None
+    @staticmethod
+    def _parse_clap_counts(post_ids, json_data):
+        """Map each post id to the clap count of its operation in a batched response.
+
+        Each operation is read on its own, so a post whose operation failed is only left out
+        of the counts; returns the counts and the error of every post left out.
+        """
+        if not isinstance(json_data, list):
+            # Not one result per operation (a request-level error or no JSON): the whole batch failed
+            raise FetchError(f"Clap count query failed: {json_data}")
+        clap_counts, failures = {}, {}
+        # The endpoint answers a batch with one result per operation, in request order
+        results = json_data + [None] * (len(post_ids) - len(json_data))
+        for post_id, result in zip(post_ids, results):
+            if not isinstance(result, dict) or "errors" in result:
+                errors = result.get("errors") if isinstance(result, dict) else "no result for the operation"
+                failures[post_id] = f"Clap count query failed: {errors}"
+                continue
+            clap_counts[post_id] = ((result.get("data") or {}).get("postResult") or {}).get("clapCount", 0)
+        return clap_counts, failures
+
+    # Function to fetch the clap counts for a page of Medium posts in one request
+    def _fetch_clap_counts(self, post_ids):
+        if not post_ids:
+            return {}, {}
+        response = self._post_graphql(self._clap_counts_payload(post_ids), 'graphql_claps')
+        if response.status_code != 200:
+            return {}, self._clap_counts_unavailable(post_ids, f"Clap count query failed: HTTP {response.status_code}")
+        return self._parse_clap_counts(post_ids, self._decode_json(response))
+
+    def _resolve_clap_counts(self, posts):
+        """Return the clap counts of a page of posts, using the feed values when enabled.
+
+        Also returns the error of every post whose clap count could not be resolved. A failed
+        batch request is retried; a failed operation of a single post is not.
+        """
+        clap_counts, missing = self._feed_clap_counts(posts)
+        try:
+            resolved, failures = self._with_retries(lambda: self._fetch_clap_counts(missing), "clap counts")
+            clap_counts.update(resolved)
+        except FetchError as error:
+            failures = self._clap_counts_unavailable(missing, error)
+        return clap_counts, failures
+
+    def _feed_clap_counts(self, posts):
+        """Return the clap counts a page of posts carries in the feed, when enabled, and the ids of the other posts."""
+        clap_counts = {}
+        if self.feed_clap_counts:
+            clap_counts = {post['id']: post['clapCount'] for post in posts if post.get('clapCount') is not None}
+        return clap_counts, [post['id'] for post in posts if post['id'] not in clap_counts]
 
-    def _preprocess_html_for_images(self, soup):
+    @staticmethod
+    def _clap_counts_unavailable(post_ids, error):
+        """Return the failures of a clap count lookup that failed as a whole, one per post."""
+        logger.warning("Failed to fetch clap counts: %s", error)
+        return dict.fromkeys(post_ids, str(error))
+
+    def _dead_letter_feed_page(self, tag_slug, from_page, error):
+        """Dead-letter a feed page that kept failing; its tag stops there."""
+        # The page is never added to the page checkpoints, so --resume picks the tag up at this page
+        self.retry_queue.dead_letter({'url': GRAPHQL_URL, 'tag_slug': tag_slug, 'from': from_page,
+                                      'attempts': self.retry_queue.max_attempts, 'error': str(error)})
+        self.metrics.count('dead_letters')
+
+    def _article_jobs(self, posts, clap_counts, failures, tag_slug):
+        """Return the article jobs of a page of posts, dead-lettering the posts without a clap count."""
+        jobs = []
+        for post in posts:
+            if post['id'] not in clap_counts:
+                # Recorded, since the checkpoint moves past this page
+                self.metrics.count('articles.skipped.no_claps')
+                self._dead_letter_post(post, tag_slug, failures.get(post['id'], "Clap count unavailable"))
+                continue
+            jobs.append({'url': self._post_url(post), 'tag_slug': tag_slug, 'post': post,
+                         'clap_count': clap_counts[post['id']]})
+        return jobs
+
+    def _dead_letter_post(self, post, tag_slug, error):
+        """Dead-letter a feed post whose article is never fetched, e.g. for want of a clap count."""
+        self.retry_queue.dead_letter({'url': self._post_url(post), 'tag_slug': tag_slug, 'post': post,
+                                      'attempts': 0, 'error': error})
+        self.metrics.count('dead_letters')
+
+    @staticmethod
+    def _preprocess_html_for_images(soup):
         figures = soup.find_all('figure')
         image_info_list = []
         for i, figure in enumerate(figures):
@@ -175,7 +425,7 @@ class MediumScraper:
                 source = picture.find('source')
                 if source and 'srcset' in source.attrs:
                     srcset = source['srcset']
-                    highest_resolution_image = self._extract_highest_resolution_image(
+                    highest_resolution_image = MediumScraper._extract_highest_resolution_image(
                         srcset)
                     # Create a unique placeholder for each image
                     placeholder = f"{{{{IMAGE_PLACEHOLDER_{i}}}}}"
@@ -186,123 +436,394 @@ class MediumScraper:
                         (highest_resolution_image, escaped_placeholder))
         return image_info_list
 
-    def _fetch_and_convert_article_section_to_markdown(self, url, tag_slug, clap_range):
-        """Fetch an article, convert it to markdown, and save locally."""
-        print(f"Fetching article {url}")
+    @staticmethod
+    def _post_url(post):
+        """Build the canonical article URL for a feed post."""
+        return f"{MEDIUM_URL}/@{post['creator']['username']}/{post['uniqueSlug']}"
+
+    @staticmethod
+    def _article_location(url, tag_slug, clap_range):
+        """Return the folder name, folder path and markdown path of an article."""
         article_folder_name = url.split('/')[-1].strip()
         article_folder_path = os.path.join(ARTICLES_DIRECTORY, tag_slug, str(clap_range), article_folder_name)
-        file_name = f"{article_folder_name}.md"
-        file_path = os.path.join(article_folder_path, file_name)
-        if article_folder_name in self.downloaded_articles:
-            print(f"Article already downloaded: {url}")
+        file_path = os.path.join(article_folder_path, f"{article_folder_name}.md")
+        return article_folder_name, article_folder_path, file_path
+
+    @staticmethod
+    def _parse_article(content):
+        """Parse the article section of a page; returns None when there is none."""
+        soup = BeautifulSoup(content, 'lxml', parse_only=ARTICLE_ONLY)
+        return soup.find('article')
+
+    @staticmethod
+    def _article_to_markdown(article_section):
+        """Convert a parsed article section to markdown with image placeholders."""
+        image_info_list = MediumScraper._preprocess_html_for_images(article_section)
+        # Convert the parsed tree directly instead of serializing it for markdownify to parse again
+        markdown_content = MARKDOWN_CONVERTER.convert_soup(article_section)
+        return markdown_content, image_info_list
+
+    @staticmethod
+    def _convert_article_html(content):
+        """Convert the article section of a page to markdown with image placeholders."""
+        article_section = MediumScraper._parse_article(content)
+        if not article_section:
+            return None, []
+        return MediumScraper._article_to_markdown(article_section)
+
+    def _convert_article(self, content):
+        """`_convert_article_html`, timing the parse and markdown stages separately."""
+        with self.metrics.timer('parse'):
+            article_section = self._parse_article(content)
+        if not article_section:
+            self.metrics.count('articles.no_section')
+            logger.warning("Article section not found")
+            return None, []
+        with self.metrics.timer('markdown'):
+            return self._article_to_markdown(article_section)
+
+    @staticmethod
+    def _replace_image_placeholders(markdown_content, image_paths):
+        """Swap each image placeholder for a markdown link to its downloaded file, in one pass."""
+        replacements = {placeholder: f"![]({relative_image_path})" for placeholder, relative_image_path in image_paths}
+        if not replacements:
+            return markdown_content
+
+        def substitute(match):
+            # Each placeholder is replaced at its first occurrence only
+            return replacements.pop(match.group(0), match.group(0))
+
+        return IMAGE_PLACEHOLDER_PATTERN.sub(substitute, markdown_content)
+
+    def _cache_responses(self, post_id, post, clap_count, content):
+        """Store the raw article HTML and the post's feed data in the response cache, when enabled."""
+        if self.response_cache is None:
+            return
+        self.response_cache.put(post_id, 'graphql', json.dumps({'post': post, 'clapCount': clap_count}))
+        self.response_cache.put(post_id, 'html', content)
+        self.metrics.count('cache.stored')
+
+    @staticmethod
+    def _catalog_entry(post, clap_count):
+        """Return the catalog fields of a feed post, as keyword arguments for the crawl index."""
+        post = post or {}
+        published_at = post.get('firstPublishedAt')
+        return {
+            'title': post.get('title'),
+            'author': (post.get('creator') or {}).get('username'),
+            'clap_count': clap_count,
+            'reading_time': post.get('readingTime'),
+            # Medium reports milliseconds since the epoch
+            'published_at': published_at / 1000 if published_at else None,
+            'tags': [tag['id'] for tag in post.get('tags') or [] if tag.get('id')],
+        }
+
+    def _save_article(self, post_id, tag_slug, clap_range, file_path, markdown_content, post=None, clap_count=None):
+        """Write an article's markdown and record it in the crawl index and catalog."""
+        with self.metrics.timer('write'):
+            with open(file_path, 'w', encoding='utf-8') as file:
+                file.write(markdown_content)
+            slug = os.path.basename(os.path.dirname(file_path))
+            entry = self._catalog_entry(post, clap_count)
+            entry['title'] = entry['title'] or markdown_title(markdown_content)
+            self.crawl_index.record(post_id, slug, tag_slug, clap_range, file_path, content_hash(markdown_content),
+                                    word_count=word_count(markdown_content), **entry)
+        self.metrics.count('articles.saved')
+        logger.debug("Article section saved to %s", file_path)
+
+    def _fetch_and_convert_article_section_to_markdown(self, url, tag_slug, clap_range, post_id=None, post=None,
+                                                       clap_count=None):
+        """Fetch an article, convert it to markdown, and save locally.
+
+        Raises FetchError when the article or one of its images could not be fetched.
+        """
+        logger.info("Fetching article %s", url)
+        article_folder_name, article_folder_path, file_path = self._article_location(url, tag_slug, clap_range)
+        post_id = post_id or post_id_from_slug(article_folder_name)
+        if post_id in self.crawl_index:
+            logger.debug("Article already downloaded: %s", url)
+            self.metrics.count('articles.skipped.known')
             return  # Skip downloading this article
-        response = requests.get(url, headers=HEADERS)
+        if self.claim_posts and not self.crawl_index.claim(post_id):
+            logger.debug("Article is being downloaded by another worker: %s", url)
+            self.metrics.count('articles.skipped.claimed')
+            return
+        try:
+            with self.metrics.timer('article'):
+                self._fetch_article(url, post_id, tag_slug, clap_range, article_folder_path, file_path, post,
+                                    clap_count)
+        except FetchError:
+            if self.claim_posts:
+                # Let the retry, or another worker, claim it again
+                self.crawl_index.release(post_id)
+            raise
+
+    def _fetch_article(self, url, post_id, tag_slug, clap_range, article_folder_path, file_path, post, clap_count):
+        response = self._get(url, 'article')
+        self.metrics.count('articles.fetched')
         if response.status_code == 200:
-            if self.is_json(response.text) and self._check_for_errors(response.json()):
-                print(response.text)
-                sys.exit(1)
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            if not os.path.exists(article_folder_path):
-                os.makedirs(article_folder_path)
-            article_section = soup.find('article')
-            if article_section:
-                image_info_list = self._preprocess_html_for_images(article_section)
-                markdown_content = md(str(article_section), heading_style="ATX")
+            self._check_article_page(url, response.headers.get('Content-Type', ''), response.content)
+            self._cache_responses(post_id, post, clap_count, response.content)
+            markdown_content, image_info_list = self._convert_article(response.content)
+            if markdown_content is not None:
+                if not os.path.exists(article_folder_path):
+                    os.makedirs(article_folder_path)
                 # Replace placeholders with actual image paths
-                for image_url, placeholder in image_info_list:
-                    relative_image_path = self._download_image(image_url, article_folder_path)
-                    if relative_image_path:
-                        markdown_content = markdown_content.replace(placeholder, f"![]({relative_image_path})", 1)
-
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    file.write(markdown_content)
-                print(f"Article section saved to {file_path}")
-            else:
-                print("Article section not found")
+                image_paths = []
+                with self.metrics.timer('images'):
+                    for image_url, placeholder in image_info_list:
+                        relative_image_path = self._download_image(image_url, article_folder_path)
+                        if relative_image_path:
+                            image_paths.append((placeholder, relative_image_path))
+                markdown_content = self._replace_image_placeholders(markdown_content, image_paths)
+                self._save_article(post_id, tag_slug, clap_range, file_path, markdown_content, post, clap_count)
         else:
-            print("Failed to retrieve the article")
+            raise FetchError(f"Failed to retrieve the article {url}: HTTP {response.status_code}", retryable=False)
 
-    def fetch_posts(self, from_page, tag_slug):
-        """Fetch posts from Medium and process them."""
-        recommended_feed = tag_slug == "recommended"
-        payload = [{
+    @staticmethod
+    def _check_article_page(url, content_type, body):
+        """Raise a retryable FetchError when an article page is a JSON error payload instead of HTML."""
+        # Only a JSON body can be an error payload; an article page is never decoded as text
+        if 'json' in content_type and MediumScraper._check_for_errors(MediumScraper._decode_json_body(body)):
+            raise FetchError(f"Error payload instead of article {url}: {body[:200]!r}")
+
+    def _article_job(self, job):
+        """Fetch and save the article of a job, queueing it for another attempt if that fails."""
+        post = job['post']
+        clap_range = self._get_clap_range_for_clap_count(job['clap_count'])
+        try:
+            self._fetch_and_convert_article_section_to_markdown(job['url'], job['tag_slug'], clap_range=clap_range,
+                                                                post_id=post['id'], post=post,
+                                                                clap_count=job['clap_count'])
+        except FetchError as error:
+            if self._schedule_retry(job, error):
+                # Its page stays unfinished until the retry is saved or dead-lettered
+                return
+        self.page_checkpoints.job_done(job)
+
+    def _schedule_retry(self, job, error):
+        """Queue a failed article job for another attempt; returns False when it was dead-lettered instead."""
+        if self.retry_queue.schedule(job, error):
+            self.metrics.count('retries.article')
+            return True
+        self.metrics.count('dead_letters')
+        return False
+
+    def _retry_failed_articles(self, wait=False):
+        """Run the failed article fetches whose backoff has elapsed; with `wait`, until none are left."""
+        while True:
+            for job in self.retry_queue.pop_due():
+                self._article_job(job)
+            delay = self.retry_queue.next_due_in()
+            if delay is None or not wait:
+                return
+            self.metrics.observe('sleep.retry_backoff.seconds', delay)
+            time.sleep(delay)
+
+    @staticmethod
+    def _feed_payload(from_page, tag_slug):
+        """Build the GraphQL payload for one page of a tag feed or the recommended feed."""
+        paging = {"from": f"{from_page}", "limit": 25}
+        if tag_slug == "recommended":
+            return [{
+                "operationName": "WebInlineRecommendedFeedQuery",
+                "variables": {"forceRank": True, "paging": paging, "skipCache": True},
+                "query": RECOMMENDED_FEED_QUERY
+            }]
+        return [{
             "operationName": "WebInlineTopicFeedQuery",
-            "variables": {
-                "tagSlug": f"{tag_slug}",
-                "paging": {"from": f"{from_page}", "limit": 25},
-                "skipCache": True
-            },
-            "query": """query WebInlineTopicFeedQuery($tagSlug: String!, $paging: PagingOptions!, $skipCache: Boolean) { personalisedTagFeed(tagSlug: $tagSlug, paging: $paging, skipCache: $skipCache) { items { ... on TagFeedItem { post { id creator { username } title uniqueSlug __typename } __typename } __typename } pagingInfo { next { source limit from to __typename } __typename } __typename } }"""
+            "variables": {"tagSlug": f"{tag_slug}", "paging": paging, "skipCache": True},
+            "query": TAG_FEED_QUERY
         }]
 
-        payload_for_recommended_feed = [{
-            "operationName": "WebInlineRecommendedFeedQuery",
-            "variables": {
-                "forceRank": True,
-                "paging": {"from": f"{from_page}", "limit": 25},
-                "skipCache": True
-            },
-            "query": "query WebInlineRecommendedFeedQuery($paging: PagingOptions, $forceRank: Boolean) {\n  webRecommendedFeed(paging: $paging, forceRank: $forceRank) {\n    items {\n      ...InlineFeed_homeFeedItem\n      reasonString\n      __typename\n    }\n    pagingInfo {\n      next {\n        limit\n        to\n        source\n        __typename\n      }\n      __typename\n    }\n    __typename\n  }\n}\n\nfragment InlineFeed_homeFeedItem on HomeFeedItem {\n  feedId\n  moduleSourceEncoding\n  reason\n  post {\n    ...InlineFeed_post\n    __typename\n    id\n  }\n  __typename\n}\n\nfragment InlineFeed_post on Post {\n  ...PostPreview_post\n  __typename\n  id\n}\n\nfragment PostPreview_post on Post {\n  id\n  creator {\n    ...PostPreview_user\n    __typename\n    id\n  }\n  collection {\n    ...CardByline_collection\n    ...ExpandablePostByline_collection\n    __typename\n    id\n  }\n  ...InteractivePostBody_postPreview\n  firstPublishedAt\n  isLocked\n  isSeries\n  latestPublishedAt\n  inResponseToCatalogResult {\n    __typename\n  }\n  pinnedAt\n  pinnedByCreatorAt\n  previewImage {\n    id\n    focusPercentX\n    focusPercentY\n    __typename\n  }\n  readingTime\n  sequence {\n    slug\n    __typename\n  }\n  title\n  uniqueSlug\n  ...CardByline_post\n  ...PostFooterActionsBar_post\n  ...InResponseToEntityPreview_post\n  ...PostScrollTracker_post\n  ...HighDensityPreview_post\n  __typename\n}\n\nfragment PostPreview_user on User {\n  __typename\n  name\n  username\n  ...CardByline_user\n  ...ExpandablePostByline_user\n  id\n}\n\nfragment CardByline_user on User {\n  __typename\n  id\n  name\n  username\n  mediumMemberAt\n  socialStats {\n    followerCount\n    __typename\n  }\n  ...useIsVerifiedBookAuthor_user\n  ...userUrl_user\n  ...UserMentionTooltip_user\n}\n\nfragment useIsVerifiedBookAuthor_user on User {\n  verifications {\n    isBookAuthor\n    __typename\n  }\n  __typename\n  id\n}\n\nfragment userUrl_user on User {\n  __typename\n  id\n  customDomainState {\n    live {\n      domain\n      __typename\n    }\n    __typename\n  }\n  hasSubdomain\n  username\n}\n\nfragment UserMentionTooltip_user on User {\n  id\n  name\n  username\n  bio\n  imageId\n  mediumMemberAt\n  membership {\n    tier\n    __typename\n    id\n  }\n  ...UserAvatar_user\n  ...UserFollowButton_user\n  ...useIsVerifiedBookAuthor_user\n  __typename\n}\n\nfragment UserAvatar_user on User {\n  __typename\n  id\n  imageId\n  mediumMemberAt\n  membership {\n    tier\n    __typename\n    id\n  }\n  name\n  username\n  ...userUrl_user\n}\n\nfragment UserFollowButton_user on User {\n  ...UserFollowButtonSignedIn_user\n  ...UserFollowButtonSignedOut_user\n  __typename\n  id\n}\n\nfragment UserFollowButtonSignedIn_user on User {\n  id\n  name\n  __typename\n}\n\nfragment UserFollowButtonSignedOut_user on User {\n  id\n  ...SusiClickable_user\n  __typename\n}\n\nfragment SusiClickable_user on User {\n  ...SusiContainer_user\n  __typename\n  id\n}\n\nfragment SusiContainer_user on User {\n  ...SignInOptions_user\n  ...SignUpOptions_user\n  __typename\n  id\n}\n\nfragment SignInOptions_user on User {\n  id\n  name\n  __typename\n}\n\nfragment SignUpOptions_user on User {\n  id\n  name\n  __typename\n}\n\nfragment ExpandablePostByline_user on User {\n  __typename\n  id\n  name\n  imageId\n  ...userUrl_user\n  ...useIsVerifiedBookAuthor_user\n}\n\nfragment CardByline_collection on Collection {\n  name\n  ...collectionUrl_collection\n  __typename\n  id\n}\n\nfragment collectionUrl_collection on Collection {\n  id\n  domain\n  slug\n  __typename\n}\n\nfragment ExpandablePostByline_collection on Collection {\n  __typename\n  id\n  name\n  domain\n  slug\n}\n\nfragment InteractivePostBody_postPreview on Post {\n  extendedPreviewContent(\n    truncationConfig: {previewParagraphsWordCountThreshold: 400, minimumWordLengthForTruncation: 150, truncateAtEndOfSentence: true, showFullImageCaptions: true, shortformPreviewParagraphsWordCountThreshold: 30, shortformMinimumWordLengthForTruncation: 30}\n  ) {\n    bodyModel {\n      ...PostBody_bodyModel\n      __typename\n    }\n    isFullContent\n    __typename\n  }\n  __typename\n  id\n}\n\nfragment PostBody_bodyModel on RichText {\n  sections {\n    name\n    startIndex\n    textLayout\n    imageLayout\n    backgroundImage {\n      id\n      originalHeight\n      originalWidth\n      __typename\n    }\n    videoLayout\n    backgroundVideo {\n      videoId\n      originalHeight\n      originalWidth\n      previewImageId\n      __typename\n    }\n    __typename\n  }\n  paragraphs {\n    id\n    ...PostBodySection_paragraph\n    __typename\n  }\n  ...normalizedBodyModel_richText\n  __typename\n}\n\nfragment PostBodySection_paragraph on Paragraph {\n  name\n  ...PostBodyParagraph_paragraph\n  __typename\n  id\n}\n\nfragment PostBodyParagraph_paragraph on Paragraph {\n  name\n  type\n  ...ImageParagraph_paragraph\n  ...TextParagraph_paragraph\n  ...IframeParagraph_paragraph\n  ...MixtapeParagraph_paragraph\n  ...CodeBlockParagraph_paragraph\n  __typename\n  id\n}\n\nfragment ImageParagraph_paragraph on Paragraph {\n  href\n  layout\n  metadata {\n    id\n    originalHeight\n    originalWidth\n    focusPercentX\n    focusPercentY\n    alt\n    __typename\n  }\n  ...Markups_paragraph\n  ...ParagraphRefsMapContext_paragraph\n  ...PostAnnotationsMarker_paragraph\n  __typename\n  id\n}\n\nfragment Markups_paragraph on Paragraph {\n  name\n  text\n  hasDropCap\n  dropCapImage {\n    ...MarkupNode_data_dropCapImage\n    __typename\n    id\n  }\n  markups {\n    ...Markups_markup\n    __typename\n  }\n  __typename\n  id\n}\n\nfragment MarkupNode_data_dropCapImage on ImageMetadata {\n  ...DropCap_image\n  __typename\n  id\n}\n\nfragment DropCap_image on ImageMetadata {\n  id\n  originalHeight\n  originalWidth\n  __typename\n}\n\nfragment Markups_markup on Markup {\n  type\n  start\n  end\n  href\n  anchorType\n  userId\n  linkMetadata {\n    httpStatus\n    __typename\n  }\n  __typename\n}\n\nfragment ParagraphRefsMapContext_paragraph on Paragraph {\n  id\n  name\n  text\n  __typename\n}\n\nfragment PostAnnotationsMarker_paragraph on Paragraph {\n  ...PostViewNoteCard_paragraph\n  __typename\n  id\n}\n\nfragment PostViewNoteCard_paragraph on Paragraph {\n  name\n  __typename\n  id\n}\n\nfragment TextParagraph_paragraph on Paragraph {\n  type\n  hasDropCap\n  codeBlockMetadata {\n    mode\n    lang\n    __typename\n  }\n  ...Markups_paragraph\n  ...ParagraphRefsMapContext_paragraph\n  __typename\n  id\n}\n\nfragment IframeParagraph_paragraph on Paragraph {\n  type\n  iframe {\n    mediaResource {\n      id\n      iframeSrc\n      iframeHeight\n      iframeWidth\n      title\n      __typename\n    }\n    __typename\n  }\n  layout\n  ...Markups_paragraph\n  __typename\n  id\n}\n\nfragment MixtapeParagraph_paragraph on Paragraph {\n  type\n  mixtapeMetadata {\n    href\n    mediaResource {\n      mediumCatalog {\n        id\n        __typename\n      }\n      __typename\n    }\n    __typename\n  }\n  ...GenericMixtapeParagraph_paragraph\n  __typename\n  id\n}\n\nfragment GenericMixtapeParagraph_paragraph on Paragraph {\n  text\n  mixtapeMetadata {\n    href\n    thumbnailImageId\n    __typename\n  }\n  markups {\n    start\n    end\n    type\n    href\n    __typename\n  }\n  __typename\n  id\n}\n\nfragment CodeBlockParagraph_paragraph on Paragraph {\n  codeBlockMetadata {\n    lang\n    mode\n    __typename\n  }\n  __typename\n  id\n}\n\nfragment normalizedBodyModel_richText on RichText {\n  paragraphs {\n    ...normalizedBodyModel_richText_paragraphs\n    __typename\n  }\n  sections {\n    startIndex\n    ...getSectionEndIndex_section\n    __typename\n  }\n  ...getParagraphStyles_richText\n  ...getParagraphSpaces_richText\n  __typename\n}\n\nfragment normalizedBodyModel_richText_paragraphs on Paragraph {\n  markups {\n    ...normalizedBodyModel_richText_paragraphs_markups\n    __typename\n  }\n  codeBlockMetadata {\n    lang\n    mode\n    __typename\n  }\n  ...getParagraphHighlights_paragraph\n  ...getParagraphPrivateNotes_paragraph\n  __typename\n  id\n}\n\nfragment normalizedBodyModel_richText_paragraphs_markups on Markup {\n  type\n  __typename\n}\n\nfragment getParagraphHighlights_paragraph on Paragraph {\n  name\n  __typename\n  id\n}\n\nfragment getParagraphPrivateNotes_paragraph on Paragraph {\n  name\n  __typename\n  id\n}\n\nfragment getSectionEndIndex_section on Section {\n  startIndex\n  __typename\n}\n\nfragment getParagraphStyles_richText on RichText {\n  paragraphs {\n    text\n    type\n    __typename\n  }\n  sections {\n    ...getSectionEndIndex_section\n    __typename\n  }\n  __typename\n}\n\nfragment getParagraphSpaces_richText on RichText {\n  paragraphs {\n    layout\n    metadata {\n      originalHeight\n      originalWidth\n      id\n      __typename\n    }\n    type\n    ...paragraphExtendsImageGrid_paragraph\n    __typename\n  }\n  ...getSeriesParagraphTopSpacings_richText\n  ...getPostParagraphTopSpacings_richText\n  __typename\n}\n\nfragment paragraphExtendsImageGrid_paragraph on Paragraph {\n  layout\n  type\n  __typename\n  id\n}\n\nfragment getSeriesParagraphTopSpacings_richText on RichText {\n  paragraphs {\n    id\n    __typename\n  }\n  sections {\n    ...getSectionEndIndex_section\n    __typename\n  }\n  __typename\n}\n\nfragment getPostParagraphTopSpacings_richText on RichText {\n  paragraphs {\n    type\n    layout\n    text\n    codeBlockMetadata {\n      lang\n      mode\n      __typename\n    }\n    __typename\n  }\n  sections {\n    ...getSectionEndIndex_section\n    __typename\n  }\n  __typename\n}\n\nfragment CardByline_post on Post {\n  ...DraftStatus_post\n  ...Star_post\n  ...shouldShowPublishedInStatus_post\n  __typename\n  id\n}\n\nfragment DraftStatus_post on Post {\n  id\n  pendingCollection {\n    id\n    creator {\n      id\n      __typename\n    }\n    ...BoldCollectionName_collection\n    __typename\n  }\n  statusForCollection\n  creator {\n    id\n    __typename\n  }\n  isPublished\n  __typename\n}\n\nfragment BoldCollectionName_collection on Collection {\n  id\n  name\n  __typename\n}\n\nfragment Star_post on Post {\n  id\n  creator {\n    id\n    __typename\n  }\n  __typename\n}\n\nfragment shouldShowPublishedInStatus_post on Post {\n  statusForCollection\n  isPublished\n  __typename\n  id\n}\n\nfragment PostFooterActionsBar_post on Post {\n  id\n  visibility\n  allowResponses\n  postResponses {\n    count\n    __typename\n  }\n  isLimitedState\n  creator {\n    id\n    __typename\n  }\n  collection {\n    id\n    __typename\n  }\n  ...MultiVote_post\n  ...PostSharePopover_post\n  ...OverflowMenuButtonWithNegativeSignal_post\n  ...BookmarkButton_post\n  __typename\n}\n\nfragment MultiVote_post on Post {\n  id\n  creator {\n    id\n    ...SusiClickable_user\n    __typename\n  }\n  isPublished\n  ...SusiClickable_post\n  collection {\n    id\n    slug\n    __typename\n  }\n  isLimitedState\n  ...MultiVoteCount_post\n  __typename\n}\n\nfragment SusiClickable_post on Post {\n  id\n  mediumUrl\n  ...SusiContainer_post\n  __typename\n}\n\nfragment SusiContainer_post on Post {\n  id\n  __typename\n}\n\nfragment MultiVoteCount_post on Post {\n  id\n  __typename\n}\n\nfragment PostSharePopover_post on Post {\n  id\n  mediumUrl\n  title\n  isPublished\n  isLocked\n  ...usePostUrl_post\n  ...FriendLink_post\n  __typename\n}\n\nfragment usePostUrl_post on Post {\n  id\n  creator {\n    ...userUrl_user\n    __typename\n    id\n  }\n  collection {\n    id\n    domain\n    slug\n    __typename\n  }\n  isSeries\n  mediumUrl\n  sequence {\n    slug\n    __typename\n  }\n  uniqueSlug\n  __typename\n}\n\nfragment FriendLink_post on Post {\n  id\n  ...SusiClickable_post\n  ...useCopyFriendLink_post\n  ...UpsellClickable_post\n  __typename\n}\n\nfragment useCopyFriendLink_post on Post {\n  ...usePostUrl_post\n  __typename\n  id\n}\n\nfragment UpsellClickable_post on Post {\n  id\n  collection {\n    id\n    __typename\n  }\n  sequence {\n    sequenceId\n    __typename\n  }\n  creator {\n    id\n    __typename\n  }\n  __typename\n}\n\nfragment OverflowMenuButtonWithNegativeSignal_post on Post {\n  id\n  visibility\n  ...OverflowMenuWithNegativeSignal_post\n  __typename\n}\n\nfragment OverflowMenuWithNegativeSignal_post on Post {\n  id\n  creator {\n    id\n    __typename\n  }\n  collection {\n    id\n    __typename\n  }\n  ...OverflowMenuItemUndoClaps_post\n  ...AddToCatalogBase_post\n  __typename\n}\n\nfragment OverflowMenuItemUndoClaps_post on Post {\n  id\n  clapCount\n  ...ClapMutation_post\n  __typename\n}\n\nfragment ClapMutation_post on Post {\n  __typename\n  id\n  clapCount\n  ...MultiVoteCount_post\n}\n\nfragment AddToCatalogBase_post on Post {\n  id\n  isPublished\n  ...SusiClickable_post\n  __typename\n}\n\nfragment BookmarkButton_post on Post {\n  visibility\n  ...SusiClickable_post\n  ...AddToCatalogBookmarkButton_post\n  __typename\n  id\n}\n\nfragment AddToCatalogBookmarkButton_post on Post {\n  ...AddToCatalogBase_post\n  __typename\n  id\n}\n\nfragment InResponseToEntityPreview_post on Post {\n  id\n  inResponseToEntityType\n  __typename\n}\n\nfragment PostScrollTracker_post on Post {\n  id\n  collection {\n    id\n    __typename\n  }\n  sequence {\n    sequenceId\n    __typename\n  }\n  __typename\n}\n\nfragment HighDensityPreview_post on Post {\n  id\n  title\n  previewImage {\n    id\n    focusPercentX\n    focusPercentY\n    __typename\n  }\n  extendedPreviewContent(\n    truncationConfig: {previewParagraphsWordCountThreshold: 400, minimumWordLengthForTruncation: 150, truncateAtEndOfSentence: true, showFullImageCaptions: true, shortformPreviewParagraphsWordCountThreshold: 30, shortformMinimumWordLengthForTruncation: 30}\n  ) {\n    subtitle\n    __typename\n  }\n  ...HighDensityFooter_post\n  __typename\n}\n\nfragment HighDensityFooter_post on Post {\n  id\n  readingTime\n  tags {\n    ...TopicPill_tag\n    __typename\n  }\n  ...BookmarkButton_post\n  ...ExpandablePostCardOverflowButton_post\n  ...OverflowMenuButtonWithNegativeSignal_post\n  __typename\n}\n\nfragment TopicPill_tag on Tag {\n  __typename\n  id\n  displayTitle\n  normalizedTagSlug\n}\n\nfragment ExpandablePostCardOverflowButton_post on Post {\n  creator {\n    id\n    __typename\n  }\n  ...ExpandablePostCardReaderButton_post\n  __typename\n  id\n}\n\nfragment ExpandablePostCardReaderButton_post on Post {\n  id\n  collection {\n    id\n    __typename\n  }\n  creator {\n    id\n    __typename\n  }\n  clapCount\n  ...ClapMutation_post\n  __typename\n}\n"
-        }]
+    @staticmethod
+    def _feed(data, tag_slug):
+        """Return the feed object of a feed page response."""
+        feed_key = 'webRecommendedFeed' if tag_slug == "recommended" else 'personalisedTagFeed'
+        return data[0]['data'][feed_key]
 
-        print(f"Fetching posts starting from index {from_page}...")
-        response = requests.post(GRAPHQL_URL, headers=HEADERS, json=payload if not recommended_feed else payload_for_recommended_feed)
-        if response.status_code == 200:
-            data = response.json()
-
-            if self.is_json(response.text) and self._check_for_errors(data):
-                print(response.text)
-                return False
-
-            if data[0]['data']['personalisedTagFeed' if not recommended_feed else 'webRecommendedFeed']['items']:
-                for item in data[0]['data']['personalisedTagFeed' if not recommended_feed else 'webRecommendedFeed']['items']:
-                    post = item['post']
-                    post_id = post['id']
-                    username = post['creator']['username']
-                    postSlug = post['uniqueSlug']
-                    full_url = f"https://medium.com/@{username}/{postSlug}"
-                    print(full_url)
-                    clap_count = self._fetch_clap_count(post_id)
-                    clap_range = self._get_clap_range_for_clap_count(clap_count)
-                    self._fetch_and_convert_article_section_to_markdown(full_url, tag_slug, clap_range=clap_range)
-                    time.sleep(random.uniform(1, 5))
-                return True
+    @staticmethod
+    def _feed_items(data, tag_slug):
+        """Return the feed items of a feed page response."""
+        return MediumScraper._feed(data, tag_slug)['items']
+
+    @staticmethod
+    def _next_offset(data, tag_slug, from_page):
+        """Return the offset of the next feed page from the response's pagingInfo."""
+        next_page = (MediumScraper._feed(data, tag_slug).get('pagingInfo') or {}).get('next') or {}
+        if next_page.get('from'):
+            return int(next_page['from'])
+        # The recommended feed does not report an offset, so step by the page size
+        return int(from_page) + 25
+
+    def _new_posts(self, posts):
+        """Drop posts already in the crawl index.
+
+        Returns the new posts and whether the tag is caught up, i.e. `stop_after_known`
+        consecutive known posts were seen; posts after that point are dropped too.
+        """
+        new_posts = []
+        for post in posts:
+            if post['id'] not in self.crawl_index:
+                self.known_streak = 0
+                new_posts.append(post)
+                continue
+            logger.debug("Article already downloaded: %s", self._post_url(post))
+            self.metrics.count('articles.skipped.known')
+            self.known_streak += 1
+            if self.stop_after_known and self.known_streak >= self.stop_after_known:
+                logger.info("Seen %d consecutive already-downloaded posts, the tag is caught up.", self.known_streak)
+                return new_posts, True
+        return new_posts, False
+
+    def _start_offset(self, tag_slug):
+        """Return the feed offset to start a tag from, honouring `--resume`, and reset the per-tag state."""
+        self.known_streak = 0
+        self.page_checkpoints = PageCheckpoints(self.crawl_index, tag_slug)
+        checkpoint = self.crawl_index.get_checkpoint(tag_slug) if self.resume else None
+        if checkpoint is None:
+            return 0
+        next_from, updated_at = checkpoint
+        logger.info("Resuming tag '%s' from index %s (last page at %s).", tag_slug, next_from, time.ctime(updated_at))
+        return next_from
+
+    def _fetch_feed_page(self, from_page, tag_slug):
+        """Fetch one feed page; returns the response and its decoded JSON (None unless a 200 JSON answer)."""
+        response = self._post_graphql(self._feed_payload(from_page, tag_slug), 'graphql_feed')
+        data = self._decode_json(response) if response.status_code == 200 else None
+        if self._check_for_errors(data):
+            raise FetchError(f"Feed query failed: {response.text}")
+        return response, data
+
+    def fetch_posts(self, from_page, tag_slug):
+        """Fetch a page of posts from Medium and process them.
+
+        Returns the offset of the next page, or None when the tag is done or the page failed.
+        """
+        logger.info("Fetching posts starting from index %s...", from_page)
+        try:
+            response, data = self._with_retries(lambda: self._fetch_feed_page(from_page, tag_slug),
+                                                f"feed page {from_page}")
+        except FetchError as error:
+            self._dead_letter_feed_page(tag_slug, from_page, error)
+            return None
+        if data is not None:
+            items = self._feed_items(data, tag_slug)
+            if items:
+                new_posts, caught_up = self._new_posts([item['post'] for item in items])
+                clap_counts, failures = self._resolve_clap_counts(new_posts)
+                jobs = self._article_jobs(new_posts, clap_counts, failures, tag_slug)
+                next_offset = None if caught_up else self._next_offset(data, tag_slug, from_page)
+                self.page_checkpoints.add_page(next_offset, jobs)
+                for job in jobs:
+                    self._article_job(job)
+                return next_offset
             else:
-                print(
-                    f"No more posts found. The server returned the following status code '{response.status_code}' and the following response payload '{response.text}'.")
-                return False
+                logger.info("No more posts found.")
+                logger.debug("The server returned the following status code '%s' and the following response payload '%s'.",
+                             response.status_code, response.text)
+                self.page_checkpoints.add_page(None, [])
+                return None
         else:
-            print(f"Failed to retrieve content: HTTP {response.status_code}")
-            print("Response text:", response.text)
-            return False
+            logger.warning("Failed to retrieve content: HTTP %s: %s", response.status_code, response.text)
+            return None
 
-    def scrap(self):
-        """Entry point to start the scraper based on mode."""
+    def selected_tags(self):
+        """Return the tag slugs to scrape for the current mode."""
         if self.mode == 'select' and self.chosen_tags:
-            for tag_slug in self.chosen_tags:
-                self._scrap_tag(tag_slug)
+            return self.chosen_tags
         elif self.mode == 'all':
-            for tag_slug in self.tag_slugs:
-                self._scrap_tag(tag_slug)
+            return self.tag_slugs
+        return []
+
+    def scrap(self):
+        """Entry point to start the scraper based on mode."""
+        for tag_slug in self.selected_tags():
+            self._scrap_tag(tag_slug)
+
+    def print_stats(self):
+        """Print the requests made per fetched article, the time spent per stage and the counters."""
+        for line in self.metrics.summary():
+            print(line)
 
     def _scrap_tag(self, tag_slug):
         """Helper method to scrape articles for a single tag slug."""
-        print(f"Fetching articles for the tag slug '{tag_slug}'.")
-        from_page = 0
+        logger.info("Fetching articles for the tag slug '%s'.", tag_slug)
+        from_page = self._start_offset(tag_slug)
         while True:
-            if not self.fetch_posts(from_page=from_page, tag_slug=tag_slug):
+            # The checkpoint follows the pages whose articles are all saved, skipped or dead-lettered
+            from_page = self.fetch_posts(from_page=from_page, tag_slug=tag_slug)
+            if from_page is None:
                 break
-            from_page += 25
-        time.sleep(1000)
+            self._retry_failed_articles()
+        self._retry_failed_articles(wait=True)
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def positive_float(value):
+    """argparse type for rates that must be above 0."""
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
 
 
 def main():
+    # catalog imports this module, so it is imported here rather than at the top
+    from catalog import OUTPUT_FORMATS, CatalogQuery, parse_date
     parser = argparse.ArgumentParser(description='Medium Scraper Options')
     parser.add_argument('--mode', type=str, choices=['all', 'select'], default='select', help='Mode to scrape: all tag slugs or select specific ones')
+    parser.add_argument('--engine', type=str, choices=['sync', 'async'], default='sync', help='Crawl engine: one article at a time, or a concurrent asyncio worker pool')
+    parser.add_argument('--concurrency', type=positive_int, default=8, help='Number of concurrent article workers for the async engine')
+    parser.add_argument('--graphql-rate', type=positive_float, default=4.0, help='Maximum GraphQL requests per second; the rate adapts below it to 429/5xx responses')
+    parser.add_argument('--article-rate', type=positive_float, default=2.0, help='Maximum article page requests per second')
+    parser.add_argument('--image-rate', type=positive_float, default=10.0, help='Maximum image requests per second')
+    parser.add_argument('--feed-clap-counts', action='store_true', help='Use the clap counts carried by the feed response instead of a separate lookup')
+    parser.add_argument('--resume', action='store_true', help='Continue each tag from its last checkpointed feed page')
+    parser.add_argument('--stop-after-known', type=positive_int, metavar='K', help='Stop a tag once K consecutive already-downloaded posts are seen')
+    parser.add_argument('--processes', type=positive_int, help='Crawl tags in this many worker processes sharing one work queue (sync engine only); '
+                                                       '--rebuild defaults to one per CPU')
+    parser.add_argument('--cache-raw', action='store_true', help='Keep the compressed raw article HTML and feed JSON of every fetched post')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the markdown of every cached article offline, without network access')
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='Log progress (-v) or every article file and image (-vv); only warnings by default')
+    parser.add_argument('--request-log', action='store_true', help='Append one JSON line per HTTP request to a log in medium-articles/.reports')
+    parser.add_argument('--profile', metavar='PATH', help='Profile the run with cProfile and write the stats to PATH (PATH.<pid> per worker with --processes)')
+    subparsers = parser.add_subparsers(dest='command', metavar='{query}')
+    query_parser = subparsers.add_parser('query', help='Search the catalog of downloaded articles instead of crawling')
+    query_parser.add_argument('--tag', help='Only articles carrying this tag slug')
+    query_parser.add_argument('--author', help='Only articles by this Medium username')
+    query_parser.add_argument('--min-claps', type=int, help='Only articles with at least this many claps')
+    query_parser.add_argument('--published-after', type=parse_date, metavar='YYYY-MM-DD', help='Only articles first published on or after this date')
+    query_parser.add_argument('--sort', choices=list(CATALOG_SORTS), default='claps', help='Sort order; numeric sorts are descending')
+    query_parser.add_argument('--limit', type=positive_int, help='Print at most this many articles')
+    query_parser.add_argument('--format', choices=OUTPUT_FORMATS, default='table', help="Output format; 'list' prints 'title: path' lines")
     args = parser.parse_args()
-
-    scraper = MediumScraper()
+    configure_logging(args.verbose)
+    if args.command == 'query':
+        # Answered from the local catalog, without contacting Medium
+        CatalogQuery(tag=args.tag, author=args.author, min_claps=args.min_claps, published_after=args.published_after,
+                     sort=args.sort, limit=args.limit, output_format=args.format).run()
+        return
+    if args.rebuild:
+        # Offline: runs before the scraper is created, since that contacts Medium
+        from rebuild import CacheRebuild
+        CacheRebuild(processes=args.processes or os.cpu_count(), verbosity=args.verbose).run()
+        return
+    processes = args.processes or 1
+    if processes > 1 and args.engine == 'async':
+        parser.error("--processes can only be combined with the sync engine")
+
+    rates = dict(graphql_rate=args.graphql_rate, article_rate=args.article_rate, image_rate=args.image_rate)
+    scraper = MediumScraper(rates=rates, feed_clap_counts=args.feed_clap_counts, resume=args.resume,
+                            stop_after_known=args.stop_after_known, cache_raw=args.cache_raw,
+                            request_log=args.request_log)
 
     if args.mode == 'select':
         print("Available tag slugs:")
@@ -316,7 +837,35 @@ def main():
     else:
         scraper.mode = 'all'
 
-    scraper.scrap()
+    started_at = time.time()
+    with Profiler(args.profile) as profiler:
+        if processes > 1:
+            from parallel import ParallelCrawl
+            # Every process has its own budgets, so split the rates between them
+            options = dict(rates={name: rate / processes for name, rate in rates.items()}, feed_clap_counts=args.feed_clap_counts,
+                           resume=args.resume, stop_after_known=args.stop_after_known, cache_raw=args.cache_raw,
+                           request_log=args.request_log)
+            # Start from this process's metrics, which hold the followed tags request
+            crawl = ParallelCrawl(scraper.selected_tags(), processes=processes, scraper_options=options,
+                                  verbosity=args.verbose, profile=args.profile, metrics=scraper.metrics)
+            crawl.run()
+            metrics = crawl.metrics
+        else:
+            if args.engine == 'async':
+                # Imported lazily so the sync engine does not need aiohttp installed
+                from async_engine import AsyncCrawlEngine
+                AsyncCrawlEngine(scraper, concurrency=args.concurrency).scrap(scraper.selected_tags())
+            else:
+                scraper.scrap()
+            scraper.print_stats()
+            metrics = scraper.metrics
+    finished_at = time.time()
+    report_path = os.path.join(reports_directory(ARTICLES_DIRECTORY), f"run-{run_stamp()}.json")
+    write_run_report(report_path, metrics, started_at=started_at, finished_at=finished_at,
+                     seconds=finished_at - started_at, arguments=vars(args), tags=scraper.selected_tags(),
+                     rates=scraper.rate_limiter.rates())
+    print(f"Run report written to {report_path}")
+    profiler.print_top()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawl_index import CrawlIndex, PageCheckpoints  # noqa: E402
+
+
+def make_checkpoints(tmp_path):
+    crawl_index = CrawlIndex(str(tmp_path))
+    return crawl_index, PageCheckpoints(crawl_index, 'python')
+
+
+def next_from(crawl_index):
+    checkpoint = crawl_index.get_checkpoint('python')
+    return checkpoint[0] if checkpoint else None
+
+
+def test_checkpoint_waits_for_earlier_pages(tmp_path):
+    crawl_index, pages = make_checkpoints(tmp_path)
+    first, second = [{}, {}], [{}]
+    pages.add_page(25, first)
+    pages.add_page(50, second)
+    pages.job_done(second[0])
+    assert next_from(crawl_index) is None
+    pages.job_done(first[0])
+    pages.job_done(first[1])
+    assert next_from(crawl_index) == 50
+
+
+def test_job_queued_for_a_retry_keeps_its_page_open(tmp_path):
+    crawl_index, pages = make_checkpoints(tmp_path)
+    retried, saved = {}, {}
+    pages.add_page(25, [retried, saved])
+    pages.job_done(saved)
+    # `retried` is in the retry queue, which a crash loses, so --resume must fetch its page again
+    pages.add_page(50, [])
+    assert next_from(crawl_index) is None
+    pages.job_done(retried)
+    assert next_from(crawl_index) == 50
+
+
+def test_last_page_clears_the_checkpoint_once_finished(tmp_path):
+    crawl_index, pages = make_checkpoints(tmp_path)
+    crawl_index.save_checkpoint('python', 25)
+    job = {}
+    pages.add_page(50, [job])
+    pages.add_page(None, [])
+    assert next_from(crawl_index) == 25
+    pages.job_done(job)
+    assert next_from(crawl_index) is None